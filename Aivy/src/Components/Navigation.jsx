@@ -111,7 +111,7 @@ const ChatView = ({ convo, onSend, onDelete, onUpload }) => {
 
       {/* Messages */}
       <div className="flex-1 overflow-auto px-6 py-6 space-y-4">
-        {convo.messages.map((m, idx) => {
+        {(convo.messages || []).map((m, idx) => {
           const isUser = m.role === "user";
           const isAssistant = m.role === "assistant";
           const toRender = isUser || isAssistant;
@@ -296,6 +296,16 @@ const Navigation = () => {
   const controllersRef = useRef({});
 
   const activeConvo = conversations.find((c) => c._id === activeConvoId);
+
+  // chat listings leave messages out; load them when a chat is opened
+  useEffect(() => {
+    if (!activeConvo || activeConvo.messages || !activeConvo._id) return;
+    getChatById(activeConvo._id).then((chat) => {
+      setConversations((prev) =>
+        prev.map((c) => (c._id === chat._id ? { ...c, messages: chat.messages } : c))
+      );
+    });
+  }, [activeConvo]);
   const activeGroup = groups.find((g) => g._id === activeGroupId);
   const chatsInActiveGroup = conversations.filter(
     (c) => c.space_id === activeGroupId
@@ -382,7 +392,7 @@ const Navigation = () => {
     setConversations((prev) =>
       prev.map((c) =>
         c._id === idCaptured
-          ? { ...c, messages: [...c.messages, { role: "user", content: text }] }
+          ? { ...c, messages: [...(c.messages || []), { role: "user", content: text }] }
           : c
       )
     );
@@ -394,7 +404,7 @@ const Navigation = () => {
             ? {
                 ...c,
                 messages: [
-                  ...c.messages,
+                  ...(c.messages || []),
                   { role: "assistant", content: [{text: message}] },
                 ],
               }
@@ -458,7 +468,7 @@ const Navigation = () => {
             ? {
                 ...c,
                 messages: [
-                  ...c.messages,
+                  ...(c.messages || []),
                   {
                     role: "assistant",
                     content: `📎 Uploaded ${files.length} file(s) successfully.`,
@@ -475,7 +485,7 @@ const Navigation = () => {
             ? {
                 ...c,
                 messages: [
-                  ...c.messages,
+                  ...(c.messages || []),
                   { role: "assistant", content: "Upload failed." },
                 ],
               }
@@ -1,11 +1,11 @@
-import requests
 import asyncio
+from dataclasses import dataclass
 from typing import List, Optional
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
-from agents import function_tool
-import requests
+from agents import function_tool, RunContextWrapper
+import http_client
 import os
 from pydantic import BaseModel
 load_dotenv()
@@ -17,9 +17,18 @@ class FlashcardResponse(BaseModel):
 # Base URL for your API
 API_BASE_URL = os.getenv("API_BASE_URL")
 pet_base_url = os.getenv("PET_SERVICE_URL")
+# retrieval mode for the tutor's document search: vector, text or hybrid
+search_mode = os.getenv("SEARCH_MODE", "hybrid")
 
 
-def create_flashcard(topic_name: str, space_id: str, question: str, options: list[str], answer: int):
+@dataclass
+class TutorContext:
+    """Per-request state handed to the tools through the run context."""
+    chat_id: str
+    space_id: str
+
+
+async def create_flashcard(topic_name: str, space_id: str, question: str, options: list[str], answer: int):
     """
     Creates a flashcard for a given topic, question, choices, and answer.
     Only creates 3 options
@@ -45,7 +54,7 @@ def create_flashcard(topic_name: str, space_id: str, question: str, options: lis
     print(f"Question: {question}")
     print(f"Choices: {options}")
     print(f"Correct Answer: {answer}")
-    response = requests.post(
+    response = await http_client.post(
         f"{pet_base_url}/flashcards/insert",
         json={
             "flashcards": data
@@ -53,7 +62,7 @@ def create_flashcard(topic_name: str, space_id: str, question: str, options: lis
     )
     return response.json()
 
-def vector_search(query: str, limit: int, space_id: str):
+async def vector_search(query: str, limit: int, space_id: str):
     """
     Searches for relevant documents in the vector database.
     
@@ -63,29 +72,61 @@ def vector_search(query: str, limit: int, space_id: str):
         space_id: str
     """
     print(f"Vector search initiated with query: {query}, limit: {limit}, space_id: {space_id}")
-    response = requests.post(
+    response = await http_client.post(
         f"{API_BASE_URL}/search_documents/",
-        json={"query": query, "limit": limit, "space_id": space_id}
+        json={"query": query, "limit": limit, "space_id": space_id, "mode": search_mode}
     )
     return response.json()
 
 @function_tool
-def add_topic_score(topic_name: str):
+async def add_topic_score(topic_name: str):
     """
     Adds one point to the topic score
     """
-    response = requests.post(
+    response = await http_client.post(
         f"{API_BASE_URL}/add_topic_score/",
         json={"topic_name": topic_name}
     )
     return response.json()
 
 @function_tool
-def get_topic_score(topic_name: str):
+async def get_topic_score(topic_name: str):
     """
     Gets the score of a topic
     """
-    response = requests.get(
+    response = await http_client.get(
         f"{API_BASE_URL}/topic_scores/{topic_name}",
     )
-    return response.json()
\ No newline at end of file
+    return response.json()
+
+
+@function_tool
+async def vector_search_tool(ctx: RunContextWrapper[TutorContext], query: str, limit: int):
+    """
+    Searches the vector database for relevant information to help the student.
+    
+    args:
+        query: str (the query to search the vector database)
+        limit: int (the number of results to return)
+    returns:
+        results: list[dict] (the results of the search)
+    """
+    return await vector_search(query, limit, ctx.context.space_id)
+
+@function_tool
+async def create_flashcard_tool(ctx: RunContextWrapper[TutorContext], topic_name: str, question: str, options: list[str], answer: int):
+    """
+    Creates a flashcard for a given topic, question, choices, and answer.
+    Only creates 3 options
+    and the answer is the index of the correct option
+    
+    args:
+        topic: str
+        question: str
+        choices: list[str]
+        answer: int (0 indexed from the choices)
+    returns:
+        status: str (success or error)
+        message: str (explanation of the status)
+    """
+    return await create_flashcard(topic_name, ctx.context.space_id, question, options, answer)
@@ -1,14 +1,20 @@
 from dis import Instruction
 from agents import Agent, Runner
-from agent_tools import create_flashcard, vector_search, add_topic_score, get_topic_score
-from agents import function_tool, WebSearchTool
+from agent_tools import TutorContext, vector_search_tool, create_flashcard_tool, add_topic_score, get_topic_score
+from compaction import load_context, needs_compaction, compact, estimate_tokens, metrics
+from agents import WebSearchTool
 from dotenv import load_dotenv
 from pydantic import BaseModel
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-import requests
+from contextlib import asynccontextmanager
+from openai.types.responses import ResponseTextDeltaEvent
+from sse_starlette.sse import EventSourceResponse
+import http_client
+import json
 import os
 import asyncio
+import time
 load_dotenv()
 
 from agents import Agent, Runner
@@ -16,6 +22,9 @@ from agents import Agent, Runner
 base_url = os.getenv("API_BASE_URL")
 pet_base_url = os.getenv("PET_SERVICE_URL")
 
+# strong references to fire-and-forget tasks so they aren't garbage collected mid-run
+background_tasks: set[asyncio.Task] = set()
+
 agent = Agent(name="Tutor", 
               instructions=f"""
 You are an expert AI tutor that teaches through the Socratic method. 
@@ -113,7 +122,7 @@ Success Criteria:
 You succeed when students discover answers through your questions, all information is grounded in verified sources, 
 flashcards are created at appropriate milestones, students demonstrate increased understanding, complex topics are broken into manageable paths, and every response reflects Chain of Thought reasoning.
 """,
-              tools=[WebSearchTool(), add_topic_score, get_topic_score],
+              tools=[WebSearchTool(), vector_search_tool, create_flashcard_tool, add_topic_score, get_topic_score],
               model="gpt-4o"
               )
 
@@ -126,7 +135,18 @@ class Message(BaseModel):
     content: str
     space_id: str
     
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    http_client.open_clients(base_url, pet_base_url)
+    try:
+        yield
+    finally:
+        # let summaries that are being written finish before the clients go away
+        if background_tasks:
+            await asyncio.wait(background_tasks, timeout=10)
+        await http_client.close_clients()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -145,60 +165,170 @@ def assemble_conversation(result, new_input):
         new_input = new_input
     return new_input
 
+class StreamMetrics:
+    """Running per-process latency counters for /chat/stream."""
+
+    def __init__(self):
+        self.streams = 0
+        self.total_ttft_ms = 0.0
+        self.max_ttft_ms = 0.0
+        self.total_duration_ms = 0.0
+
+    def record(self, ttft_ms: float, duration_ms: float):
+        self.streams += 1
+        self.total_ttft_ms += ttft_ms
+        self.max_ttft_ms = max(self.max_ttft_ms, ttft_ms)
+        self.total_duration_ms += duration_ms
+
+    def snapshot(self) -> dict:
+        return {
+            "streams": self.streams,
+            "avg_time_to_first_token_ms": round(self.total_ttft_ms / self.streams, 1) if self.streams else 0.0,
+            "max_time_to_first_token_ms": round(self.max_ttft_ms, 1),
+            "avg_duration_ms": round(self.total_duration_ms / self.streams, 1) if self.streams else 0.0,
+        }
+
+stream_metrics = StreamMetrics()
+
+def run_in_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def persist_turn(context, new_messages) -> bool:
+    """
+    Append a finished turn to the chat and fold old turns into the summary if due
+    """
+    update_resp = await http_client.put(
+            f"{base_url}/bulk/messages/{context.chat_id}", 
+            json=new_messages
+    )
+    update_data = update_resp.json()
+    if update_data.get("status") != "success":
+        return False
+    context.message_count = update_data["last_seq"] + 1
+    if needs_compaction(context):
+        run_in_background(compact(context))
+    return True
+
+async def save_streamed_turn(context, new_messages):
+    """
+    persist_turn for runs whose reply has already been streamed; failures can only be logged
+    """
+    try:
+        if not await persist_turn(context, new_messages):
+            print(f"Error: Failed to update chat messages for chat {context.chat_id}")
+    except Exception as e:
+        print(f"Error: Failed to update chat messages for chat {context.chat_id}: {e}")
+
 @app.post("/chat")
 async def chat(message: Message):
-    @function_tool
-    def vector_search_tool(query: str, limit: int):
-        """
-        Searches the vector database for relevant information to help the student.
-        
-        args:
-            query: str (the query to search the vector database)
-            limit: int (the number of results to return)
-        returns:
-            results: list[dict] (the results of the search)
-        """
-        return vector_search(query, limit, message.space_id)
-    
-    @function_tool
-    def create_flashcard_tool(topic_name: str, question: str, options: list[str], answer: int):
-        """
-        Creates a flashcard for a given topic, question, choices, and answer.
-        Only creates 3 options
-        and the answer is the index of the correct option
-        
-        args:
-            topic: str
-            question: str
-            choices: list[str]
-            answer: int (0 indexed from the choices)
-        returns:
-            status: str (success or error)
-            message: str (explanation of the status)
-        """
-        return create_flashcard(topic_name, message.space_id, question, options, answer)
-    
-    
-    agent.tools.append(vector_search_tool)
-    agent.tools.append(create_flashcard_tool)
-    
-    response = requests.get(
-        f"{base_url}/chats/{message.chat_id}",
-    )
+    tutor_context = TutorContext(chat_id=message.chat_id, space_id=message.space_id)
+    context = await load_context(message.chat_id)
     
-    if response.status_code == 200:
-        data = response.json()
-        old_messages = data.get("messages")
-        result = await Runner.run(agent, old_messages + [{'content': message.content, 'role': 'user'}])
+    if context is not None:
+        old_messages = context.history()
+        result = await Runner.run(
+            agent,
+            old_messages + [{'content': message.content, 'role': 'user'}],
+            context=tutor_context,
+        )
+        metrics.record_turn(
+            message.chat_id,
+            estimate_tokens(old_messages),
+            context.tokens_saved(),
+            result.context_wrapper.usage.input_tokens,
+        )
         all_messages = result.to_input_list()
         new_messages = all_messages[len(old_messages):]
-        update_resp = requests.put(
-                f"{base_url}/bulk/messages/{message.chat_id}", 
-                json=new_messages
-        )
-        if update_resp.json()["status"] == "success":
+        if await persist_turn(context, new_messages):
             return result.final_output
         else:
             return "Error: Failed to update chat messages"
     else:
         return "Error: Failed to get chat messages"
+
+@app.post("/chat/stream")
+async def chat_stream(message: Message):
+    """
+    Same as /chat, but streams the reply as Server-Sent Events:
+    "delta" events carry text as the model produces it, "tool_call" and
+    "tool_output" report tool progress, and "done" carries the final output
+    and timings. The turn is saved in the background once the run finishes.
+    """
+    started = time.perf_counter()
+    tutor_context = TutorContext(chat_id=message.chat_id, space_id=message.space_id)
+    context = await load_context(message.chat_id)
+    if context is None:
+        raise HTTPException(status_code=502, detail="Failed to get chat messages")
+
+    old_messages = context.history()
+    result = Runner.run_streamed(
+        agent,
+        old_messages + [{'content': message.content, 'role': 'user'}],
+        context=tutor_context,
+    )
+
+    async def events():
+        first_token_at = None
+        completed = False
+        try:
+            async for event in result.stream_events():
+                if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    yield {"event": "delta", "data": json.dumps({"delta": event.data.delta})}
+                elif event.type == "run_item_stream_event" and event.name == "tool_called":
+                    raw_item = event.item.raw_item
+                    name = getattr(raw_item, "name", None) or getattr(raw_item, "type", "tool")
+                    yield {"event": "tool_call", "data": json.dumps({"name": name})}
+                elif event.type == "run_item_stream_event" and event.name == "tool_output":
+                    raw_item = event.item.raw_item
+                    call_id = raw_item.get("call_id") if isinstance(raw_item, dict) else getattr(raw_item, "call_id", None)
+                    yield {"event": "tool_output", "data": json.dumps({"call_id": call_id})}
+            completed = True
+        except Exception as e:
+            print(f"Error streaming chat {message.chat_id}: {e}")
+            yield {"event": "error", "data": json.dumps({"detail": str(e)})}
+            return
+        finally:
+            # client went away before the run finished; stop paying for it
+            if not completed:
+                result.cancel()
+
+        finished = time.perf_counter()
+        ttft_ms = ((first_token_at or finished) - started) * 1000
+        duration_ms = (finished - started) * 1000
+        stream_metrics.record(ttft_ms, duration_ms)
+        metrics.record_turn(
+            message.chat_id,
+            estimate_tokens(old_messages),
+            context.tokens_saved(),
+            result.context_wrapper.usage.input_tokens,
+        )
+        run_in_background(save_streamed_turn(context, result.to_input_list()[len(old_messages):]))
+        yield {
+            "event": "done",
+            "data": json.dumps({
+                "final_output": result.final_output,
+                "time_to_first_token_ms": round(ttft_ms, 1),
+                "duration_ms": round(duration_ms, 1),
+            }),
+        }
+
+    return EventSourceResponse(events())
+
+@app.get("/metrics/compaction")
+def get_compaction_metrics():
+    """
+    Reports how many history tokens the rolling summaries have saved
+    """
+    return metrics.snapshot()
+
+@app.get("/metrics/streaming")
+def get_streaming_metrics():
+    """
+    Reports time-to-first-token for streamed chat replies
+    """
+    return stream_metrics.snapshot()
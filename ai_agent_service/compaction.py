@@ -0,0 +1,236 @@
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, List
+
+import http_client
+from agents import Agent, Runner
+from dotenv import load_dotenv
+
+load_dotenv()
+
+base_url = os.getenv("API_BASE_URL")
+
+# most recent messages replayed verbatim on every turn
+history_window = int(os.getenv("CHAT_HISTORY_WINDOW", "40"))
+# how many messages may pile up beyond the window before they are folded into the summary
+compaction_batch = int(os.getenv("CHAT_COMPACTION_BATCH", "20"))
+# largest slice of history folded into the summary in one pass
+max_fold = 500
+
+summarizer = Agent(
+    name="Summarizer",
+    instructions="""
+You maintain the running summary of a tutoring session between a student and a Socratic AI tutor.
+You are given the current summary and the conversation turns that follow it.
+Return an updated summary that keeps:
+- the topics and concepts covered, and the course materials cited
+- what the student has shown they understand, and their misconceptions
+- flashcards created and topic scores recorded
+- questions that are still open or were left for the student to think about
+Write at most 300 words. Output only the summary.
+""",
+    model=os.getenv("SUMMARY_MODEL", "gpt-4o-mini"),
+)
+
+
+def estimate_tokens(items) -> int:
+    """Rough token count (4 characters per token) of a list of input items or a string."""
+    if isinstance(items, str):
+        return len(items) // 4
+    return sum(len(json.dumps(item, default=str)) // 4 for item in items)
+
+
+def trim_to_turn_start(messages):
+    """
+    Drop leading items until the first user message, so a history window
+    never starts in the middle of a tool call / tool output pair.
+    """
+    for idx, item in enumerate(messages):
+        if is_user_message(item):
+            return messages[idx:]
+    return []
+
+
+def is_user_message(item) -> bool:
+    return isinstance(item, dict) and item.get("role") == "user"
+
+
+@dataclass
+class ChatContext:
+    """What one turn of the tutor sees: the summary plus the unsummarized recent messages."""
+    chat_id: str
+    summary: str = ""
+    summary_seq: int = 0
+    summarized_tokens: int = 0
+    message_count: int = 0
+    messages: List[Any] = field(default_factory=list)
+
+    def history(self) -> list:
+        items = []
+        if self.summary:
+            items.append({
+                "role": "system",
+                "content": f"Summary of the earlier part of this tutoring session:\n{self.summary}",
+            })
+        return items + self.messages
+
+    def tokens_saved(self) -> int:
+        """Tokens the summary stands in for, minus what the summary itself costs."""
+        return max(0, self.summarized_tokens - estimate_tokens(self.summary))
+
+
+class CompactionMetrics:
+    """Running per-process counters of how much context compaction saves."""
+
+    def __init__(self):
+        self.turns = 0
+        self.tokens_sent = 0
+        self.tokens_saved = 0
+        self.compactions = 0
+        self.compaction_failures = 0
+        self.last_turn = {}
+
+    def record_turn(self, chat_id: str, tokens_sent: int, tokens_saved: int, input_tokens: int = 0):
+        self.turns += 1
+        self.tokens_sent += tokens_sent
+        self.tokens_saved += tokens_saved
+        self.last_turn = {
+            "chat_id": chat_id,
+            "estimated_history_tokens": tokens_sent,
+            "estimated_tokens_saved": tokens_saved,
+            "model_input_tokens": input_tokens,
+        }
+        print(f"Chat {chat_id}: sent ~{tokens_sent} history tokens, saved ~{tokens_saved} via summary")
+
+    def snapshot(self) -> dict:
+        return {
+            "turns": self.turns,
+            "estimated_history_tokens_sent": self.tokens_sent,
+            "estimated_tokens_saved": self.tokens_saved,
+            "avg_tokens_saved_per_turn": round(self.tokens_saved / self.turns, 1) if self.turns else 0.0,
+            "compactions": self.compactions,
+            "compaction_failures": self.compaction_failures,
+            "last_turn": self.last_turn,
+        }
+
+
+metrics = CompactionMetrics()
+
+# chats with a compaction already running in this process
+_compacting: set[str] = set()
+
+
+# largest page of messages the chat service returns
+max_page = 500
+
+
+async def load_context(chat_id: str) -> ChatContext | None:
+    """
+    Fetch the summary and every message after it. Usually the tail covers
+    them; when compaction lags behind, the gap between the summary and the
+    tail is fetched too, so no message is left out of both.
+    """
+    url = f"{base_url}/chats/{chat_id}/messages"
+    response = await http_client.get(url, params={"tail": history_window + compaction_batch})
+    if response.status_code != 200:
+        return None
+    data = response.json()
+    summary_seq = data.get("summary_seq", 0)
+    start_seq = data.get("start_seq", 0)
+    messages = data.get("messages", [])
+    # part of the tail may already be folded into the summary
+    already_summarized = summary_seq - start_seq
+    if already_summarized > 0:
+        messages = messages[already_summarized:]
+    gap = []
+    since_seq = summary_seq
+    while since_seq < start_seq:
+        response = await http_client.get(
+            url, params={"since_seq": since_seq, "limit": min(start_seq - since_seq, max_page)}
+        )
+        if response.status_code != 200:
+            return None
+        page = response.json()
+        gap.extend(page.get("messages", []))
+        if page.get("next_seq", since_seq) <= since_seq:
+            break
+        since_seq = page["next_seq"]
+    messages = gap + messages
+    return ChatContext(
+        chat_id=chat_id,
+        summary=data.get("summary", ""),
+        summary_seq=summary_seq,
+        summarized_tokens=data.get("summarized_tokens", 0),
+        message_count=data.get("message_count", 0),
+        messages=trim_to_turn_start(messages),
+    )
+
+
+def render_transcript(items) -> str:
+    lines = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        if item.get("role"):
+            content = item.get("content")
+            if isinstance(content, list):
+                content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+            lines.append(f"{item['role']}: {content}")
+        elif item.get("type") == "function_call":
+            lines.append(f"tool call: {item.get('name')}({item.get('arguments')})")
+        elif item.get("type") == "function_call_output":
+            lines.append(f"tool result: {str(item.get('output'))[:500]}")
+    return "\n".join(lines)
+
+
+def needs_compaction(context: ChatContext) -> bool:
+    return context.message_count - context.summary_seq > history_window + compaction_batch
+
+
+async def compact(context: ChatContext):
+    """
+    Fold everything but the last history_window messages into the chat's summary.
+    The fold ends right before a user message so the kept window starts a turn.
+    """
+    if context.chat_id in _compacting:
+        return
+    _compacting.add(context.chat_id)
+    try:
+        fold_count = min(context.message_count - history_window - context.summary_seq, max_fold)
+        response = await http_client.get(
+            f"{base_url}/chats/{context.chat_id}/messages",
+            params={"since_seq": context.summary_seq, "limit": fold_count},
+        )
+        response.raise_for_status()
+        folded = response.json()["messages"]
+        # fold whole turns only: a summary ending mid-turn would leave the rest of
+        # that turn to trim_to_turn_start, out of both the summary and the context.
+        # With no later user message in the slice, fold nothing and wait for one.
+        boundary = max((idx for idx, item in enumerate(folded) if idx > 0 and is_user_message(item)), default=0)
+        folded = folded[:boundary]
+        if not folded:
+            return
+
+        result = await Runner.run(
+            summarizer,
+            f"Current summary:\n{context.summary or '(none)'}\n\n"
+            f"Conversation turns to fold in:\n{render_transcript(folded)}",
+        )
+        update_resp = await http_client.put(
+            f"{base_url}/chats/{context.chat_id}/summary",
+            json={
+                "summary": result.final_output,
+                "summary_seq": context.summary_seq + len(folded),
+                "summarized_tokens": context.summarized_tokens + estimate_tokens(folded),
+            },
+        )
+        # 409 means another worker already moved the summary past this point
+        if update_resp.status_code not in (200, 409):
+            update_resp.raise_for_status()
+        metrics.compactions += 1
+    except Exception as e:
+        metrics.compaction_failures += 1
+        print(f"Error compacting chat {context.chat_id}: {e}")
+    finally:
+        _compacting.discard(context.chat_id)
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import random
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+timeout = httpx.Timeout(
+    float(os.getenv("HTTP_TIMEOUT", "30")),
+    connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+)
+# each upstream service gets its own client, so these limits apply per host
+limits = httpx.Limits(
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20")),
+    max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_PER_HOST", "10")),
+)
+max_retries = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+backoff_base = float(os.getenv("HTTP_BACKOFF_BASE", "0.2"))
+backoff_cap = float(os.getenv("HTTP_BACKOFF_CAP", "5"))
+
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+# the request never reached the server, so even a POST is safe to resend
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def _origin(url: str) -> str:
+    parsed = httpx.URL(url)
+    return f"{parsed.scheme}://{parsed.netloc.decode()}"
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+    """Return the keep-alive client for the host of url, creating it on first use."""
+    origin = _origin(url)
+    client = _clients.get(origin)
+    if client is None:
+        client = httpx.AsyncClient(timeout=timeout, limits=limits)
+        _clients[origin] = client
+    return client
+
+
+def open_clients(*base_urls: str | None):
+    """Create the clients for the known upstream services up front (app startup)."""
+    for base_url in base_urls:
+        if base_url:
+            get_client(base_url)
+
+
+async def close_clients():
+    clients = list(_clients.values())
+    _clients.clear()
+    await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+
+
+def _backoff(attempt: int) -> float:
+    # full jitter: sleep a random amount up to the exponential bound
+    return random.uniform(0, min(backoff_cap, backoff_base * 2 ** attempt))
+
+
+async def request(method: str, url: str, idempotent: bool | None = None, **kwargs) -> httpx.Response:
+    """
+    Send a request over the shared client for url's host.
+    Transport errors and 429/502/503/504 responses are retried with jittered
+    exponential backoff. Non-idempotent requests are only retried when the
+    connection could not be established.
+    """
+    method = method.upper()
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    client = get_client(url)
+    attempt = 0
+    while True:
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            retryable = idempotent or isinstance(e, NOT_SENT_ERRORS)
+            if not retryable or attempt >= max_retries:
+                raise
+            print(f"{method} {url} failed ({e!r}), retrying")
+        else:
+            if response.status_code not in RETRY_STATUSES or not idempotent or attempt >= max_retries:
+                return response
+            await response.aclose()
+            print(f"{method} {url} returned {response.status_code}, retrying")
+        await asyncio.sleep(_backoff(attempt))
+        attempt += 1
+
+
+async def get(url: str, **kwargs) -> httpx.Response:
+    return await request("GET", url, **kwargs)
+
+
+async def post(url: str, **kwargs) -> httpx.Response:
+    return await request("POST", url, **kwargs)
+
+
+async def put(url: str, **kwargs) -> httpx.Response:
+    return await request("PUT", url, **kwargs)
@@ -0,0 +1,138 @@
+"""
+Regression benchmark: the tutor agent's tool schemas must not grow with traffic.
+
+Drives the /chat handler N times with the model and the upstream services
+stubbed out, and checks that the agent the model would see has the same
+tools (and the same serialized schema size) on every request, and that
+each request's tools see that request's space_id. Then invokes the
+space-scoped tools concurrently with per-request contexts and checks that
+every outgoing request is scoped to its own space.
+
+Run: python test_agent_tools.py [N]
+"""
+
+import asyncio
+import json
+import sys
+import time
+from types import SimpleNamespace
+
+from agents.tool_context import ToolContext
+
+import agent_tools
+import app
+from compaction import ChatContext
+
+
+def tool_schema_size(agent) -> int:
+    schemas = []
+    for tool in agent.tools:
+        schemas.append({
+            "name": tool.name,
+            "parameters": getattr(tool, "params_json_schema", None),
+        })
+    return len(json.dumps(schemas))
+
+
+class FakeRunner:
+    """Stands in for agents.Runner and records what each run was given."""
+
+    def __init__(self):
+        self.runs = []
+
+    async def run(self, agent, input, context=None):
+        self.runs.append((len(agent.tools), tool_schema_size(agent), context.space_id))
+        return SimpleNamespace(
+            final_output="ok",
+            context_wrapper=SimpleNamespace(usage=SimpleNamespace(input_tokens=0)),
+            to_input_list=lambda: input + [{"role": "assistant", "content": "ok"}],
+        )
+
+
+async def fake_load_context(chat_id):
+    return ChatContext(chat_id=chat_id)
+
+
+async def fake_put(url, **kwargs):
+    return SimpleNamespace(json=lambda: {"status": "success", "last_seq": len(kwargs["json"]) - 1})
+
+
+async def run_requests(n: int):
+    runner = FakeRunner()
+    app.Runner = runner
+    app.load_context = fake_load_context
+    app.http_client.put = fake_put
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        app.chat(app.Message(chat_id=f"chat-{i}", content="hi", space_id=f"space-{i}"))
+        for i in range(n)
+    ))
+    elapsed = time.perf_counter() - start
+    return runner.runs, elapsed
+
+
+class FakePost:
+    """Stands in for http_client.post and records each outgoing request body."""
+
+    def __init__(self):
+        self.requests = []
+
+    async def __call__(self, url, json=None, **kwargs):
+        self.requests.append((url, json))
+        await asyncio.sleep(0)
+        return SimpleNamespace(json=lambda: {"status": "success"})
+
+
+def tool_context(tool, space_id: str, arguments: dict) -> ToolContext:
+    return ToolContext(
+        context=agent_tools.TutorContext(chat_id=f"chat-{space_id}", space_id=space_id),
+        tool_name=tool.name,
+        tool_call_id=f"call-{space_id}",
+        tool_arguments=json.dumps(arguments),
+    )
+
+
+async def invoke_tools(n: int):
+    post = FakePost()
+    agent_tools.http_client.post = post
+    calls = []
+    for i in range(n):
+        # the model's arguments name the space the call was made for, to match against the request body
+        search_args = {"query": f"space-{i}", "limit": 3}
+        flashcard_args = {"topic_name": "indexes", "question": f"space-{i}", "options": ["a", "b", "c"], "answer": 0}
+        for tool, arguments in ((agent_tools.vector_search_tool, search_args), (agent_tools.create_flashcard_tool, flashcard_args)):
+            ctx = tool_context(tool, f"space-{i}", arguments)
+            calls.append(tool.on_invoke_tool(ctx, ctx.tool_arguments))
+    await asyncio.gather(*calls)
+    return post.requests
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    runs, elapsed = asyncio.run(run_requests(n))
+
+    tool_counts = {count for count, _, _ in runs}
+    schema_sizes = {size for _, size, _ in runs}
+    print(f"{n} requests in {elapsed:.3f}s")
+    print(f"tool counts seen: {sorted(tool_counts)}")
+    print(f"tool schema sizes seen (bytes): {sorted(schema_sizes)}")
+
+    assert len(runs) == n
+    assert len(tool_counts) == 1, "agent tool list grew between requests"
+    assert len(schema_sizes) == 1, "tool schema size grew between requests"
+    assert sorted(space for _, _, space in runs) == sorted(f"space-{i}" for i in range(n))
+    assert len(app.agent.tools) == tool_counts.pop()
+    print("OK: tool schema size is constant")
+
+    requests = asyncio.run(invoke_tools(n))
+    searches = [body for url, body in requests if url.endswith("/search_documents/")]
+    flashcards = [body["flashcards"][0] for url, body in requests if url.endswith("/flashcards/insert")]
+    assert len(searches) == len(flashcards) == n
+    assert all(body["space_id"] == body["query"] for body in searches), "vector_search_tool searched outside its request's space"
+    assert all(card["spaceId"] == card["question"] for card in flashcards), "create_flashcard_tool wrote outside its request's space"
+    print(f"OK: {len(requests)} tool calls were each scoped to their request's space")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,28 @@
 from typing import Any
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pymongo import AsyncMongoClient
-from db import get_connection, close_connection
-from models import TopicScore, User, Space, Chat, Topic, LevelOfUnderstanding, Document
-from pydantic import BaseModel
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from pymongo import AsyncMongoClient, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from contextlib import asynccontextmanager
+from db import DB_NAME, open_client, close_client, get_client, pool_stats
+from models import User, Space, Chat, ChatSummary, Topic, LevelOfUnderstanding, IngestJob, Document
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
 from bson import ObjectId
-import PyPDF2
-from docx import Document as DocxDocument
-import io
-import voyageai
 from datetime import datetime, timezone
+from embeddings import get_embedding, cache as embedding_cache, batcher as embedding_batcher
+from indexes import ensure_indexes
+from ingest import SUPPORTED_EXTENSIONS, queue as ingest_queue, spool_path
+from parsing import start_executor, shutdown_executor, max_file_bytes
+from vector_store import backend as vector_store
+from pagination import Page, page_params, paginate
+from serialization import MongoJSONResponse
+from hybrid import RerankUnavailable, hybrid_candidates, reciprocal_rank_fusion, rerank, rerank_candidates
+import asyncio
+import hashlib
+import os
+import time
 
 class AddTopicToChat(BaseModel):
     user_id: str
@@ -26,26 +37,68 @@ class UpdateTopicLevelOfUnderstanding(BaseModel):
 class SearchDocuments(BaseModel):
     query: str
     space_id: str
-    limit: int = 5
-
-model = "voyage-3-large"
-vo = voyageai.Client()
+    user_id: Optional[str] = None
+    limit: int = Field(5, ge=1, le=100)
+    # exact (ENN) search scans every chunk of the space; approximate search is the default
+    exact: bool = False
+    num_candidates: Optional[int] = Field(None, ge=1, le=10000)
+    # vector similarity, full-text, or both fused with reciprocal rank fusion
+    mode: Literal["vector", "text", "hybrid"] = "vector"
+    # re-order the top results with a local cross-encoder (needs sentence-transformers)
+    rerank: bool = False
+
+# approximate searches consider this many candidates per requested result unless told otherwise
+num_candidates_per_result = int(os.getenv("VECTOR_SEARCH_CANDIDATES_PER_RESULT", "20"))
+
+# document fields that are only returned when asked for with ?fields=
+DOCUMENT_HEAVY_FIELDS = ("text_content", "embedding")
+
+def document_projection(fields: Optional[str]) -> dict:
+    """
+    Projection for document reads. By default everything but the full text and
+    the embedding; fields=name,space_id,... selects fields explicitly (_id is always returned).
+    """
+    if not fields:
+        return {field: 0 for field in DOCUMENT_HEAVY_FIELDS}
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field != "_id" and field not in Document.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown document fields: {', '.join(unknown)}")
+    return {field: 1 for field in selected}
+
+# chat fields left out of chat listings; load messages with GET /chats/{chat_id}/messages
+CHAT_LIST_PROJECTION = {"messages": 0, "summary": 0}
+
+def parse_chat_cursor(cursor: str) -> tuple[Optional[datetime], ObjectId]:
+    """Split a "<last_updated>|<_id>" chat listing cursor."""
+    try:
+        last_updated, last_id = cursor.split("|")
+        return (datetime.fromisoformat(last_updated) if last_updated else None), ObjectId(last_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-def get_embedding(data, input_type = "document"):
-  embeddings = vo.embed(
-      data, model = model, input_type = input_type
-  ).embeddings
-  return embeddings[0]
+# size of the reads used to copy an upload to the ingest spool
+upload_block_bytes = 1024 * 1024
 
 async def get_db():
-    client = get_connection()
-    db = client['aivy_db']
+    yield get_client()[DB_NAME]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    client = await open_client()
+    await ensure_indexes(client[DB_NAME])
+    start_executor()
+    ingest_queue.start(client[DB_NAME])
     try:
-        yield db
+        yield
     finally:
-        await close_connection(client)
+        await ingest_queue.stop()
+        shutdown_executor()
+        await close_client()
 
-app = FastAPI()
+# orjson rendering for every response; handlers returning Mongo documents
+# return MongoJSONResponse directly so FastAPI doesn't walk them first
+app = FastAPI(lifespan=lifespan, default_response_class=MongoJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -53,6 +106,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After-Id", "X-Next-Cursor"],
 )
 
 
@@ -66,9 +120,24 @@ def check_health():
 @app.get("/db_status")
 async def check_db_status(db: AsyncMongoClient = Depends(get_db)):
     """
-    Checks if the database is running
+    Checks if the database is running and reports connection pool metrics
     """
-    return {"status": "ok"}
+    await db.command("ping")
+    return {"status": "ok", "pool": pool_stats.snapshot()}
+
+@app.get("/embedding_cache/stats")
+def get_embedding_cache_stats():
+    """
+    Reports embedding cache hit/miss counters and Voyage batching
+    """
+    return {**embedding_cache.stats(), "batcher": embedding_batcher.stats()}
+
+@app.get("/vector_store/stats")
+def get_vector_store_stats():
+    """
+    Reports the vector search backend and, for the local backend, the loaded spaces
+    """
+    return vector_store.stats()
 
 @app.post("/users")
 async def create_user(user: User, db: AsyncMongoClient = Depends(get_db)):
@@ -78,19 +147,19 @@ async def create_user(user: User, db: AsyncMongoClient = Depends(get_db)):
     collection = db['users']
     if await collection.find_one({"email": user.email}):
         raise HTTPException(status_code=400, detail="User already exists")
-    created_user = await collection.insert_one(user.model_dump())
+    try:
+        created_user = await collection.insert_one(user.model_dump())
+    except DuplicateKeyError:
+        # another request created the same user since the check above
+        raise HTTPException(status_code=400, detail="User already exists")
     return {"status": "success", "user_id": str(created_user.inserted_id)}
 
 @app.get("/users")
-async def get_users(db: AsyncMongoClient = Depends(get_db)):
+async def get_users(page: Page = Depends(page_params), db: AsyncMongoClient = Depends(get_db)):
     """
-    Get all users from the database
+    List users in _id order, a page at a time (see pagination.paginate)
     """
-    collection = db['users']
-    users = await collection.find({}).to_list()
-    for user in users:
-        user["_id"] = str(user["_id"])
-    return users
+    return await paginate(db['users'], {}, page)
 
 @app.get("/users/{user_id}")
 async def get_user(user_id: str, db: AsyncMongoClient = Depends(get_db)):
@@ -101,8 +170,7 @@ async def get_user(user_id: str, db: AsyncMongoClient = Depends(get_db)):
     user = await collection.find_one({"_id": ObjectId(user_id)})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    user["_id"] = str(user["_id"])
-    return user
+    return MongoJSONResponse(user)
 
 @app.post("/spaces")
 async def create_space(space: Space, db: AsyncMongoClient = Depends(get_db)):
@@ -116,19 +184,18 @@ async def create_space(space: Space, db: AsyncMongoClient = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     if await collection.find_one({"space_name": space.space_name}):
         raise HTTPException(status_code=400, detail="Spaces already exists")
-    created_space = await collection.insert_one(space.model_dump())
+    try:
+        created_space = await collection.insert_one(space.model_dump())
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Spaces already exists")
     return {"status": "success", "space_id": str(created_space.inserted_id)}
 
 @app.get("/spaces")
-async def get_spaces(db: AsyncMongoClient = Depends(get_db)):
+async def get_spaces(page: Page = Depends(page_params), db: AsyncMongoClient = Depends(get_db)):
     """
-    Get all spaces from the database
+    List spaces in _id order, a page at a time (see pagination.paginate)
     """
-    collection = db['spaces']
-    spaces = await collection.find().to_list()
-    for space in spaces:
-        space["_id"] = str(space["_id"])
-    return spaces
+    return await paginate(db['spaces'], {}, page)
 
 @app.get("/spaces/user/{user_id}")
 async def get_spaces_user(user_id: str, db: AsyncMongoClient = Depends(get_db)):
@@ -137,9 +204,7 @@ async def get_spaces_user(user_id: str, db: AsyncMongoClient = Depends(get_db)):
     """
     collection = db['spaces']
     spaces = await collection.find({"user_id": user_id}).to_list()
-    for space in spaces:
-        space["_id"] = str(space["_id"])
-    return spaces
+    return MongoJSONResponse(spaces)
 
 @app.get("/spaces/{space_id}")
 async def get_space(space_id: str, db: AsyncMongoClient = Depends(get_db)):
@@ -150,8 +215,7 @@ async def get_space(space_id: str, db: AsyncMongoClient = Depends(get_db)):
     space = await collection.find_one({"_id": ObjectId(space_id)})
     if not space:
         raise HTTPException(status_code=404, detail="Spaces not found")
-    space["_id"] = str(space["_id"])
-    return space
+    return MongoJSONResponse(space)
 
 @app.put("/spaces/{space_id}")
 async def update_space(space_id: str, space_name: str, db: AsyncMongoClient = Depends(get_db)):
@@ -185,37 +249,46 @@ async def create_chat(chat: Chat, db: AsyncMongoClient = Depends(get_db)):
     space = await space_collection.find_one({"_id": ObjectId(chat.space_id)})
     if not space:
         raise HTTPException(status_code=404, detail="Spaces not found")
+    chat.message_count = len(chat.messages)
     created_chat = await collection.insert_one(chat.model_dump())
     return {"status": "success", "chat_id": str(created_chat.inserted_id)}
 
 @app.put("/bulk/messages/{chat_id}")
 async def bulk_update_messages(chat_id: str, bulk_update_messages: list[Any], db: AsyncMongoClient = Depends(get_db)):
     """
-    Bulk update messages for a chat
+    Append messages to a chat.
+    The append and the message_count bump happen in one atomic update, so
+    concurrent turns never overwrite each other and the new messages get
+    seqs first_seq..last_seq (their positions in the messages array).
     """
     collection = db['chats']
-    chat = await collection.find_one({"_id": ObjectId(chat_id)})
-    if not chat:
-        raise HTTPException(status_code=404, detail="Chat not found")
-    chat = Chat(**chat)
-    for message in bulk_update_messages:
-        chat.messages.append(message)
-    await collection.update_one(
+    added_count = len(bulk_update_messages)
+    chat = await collection.find_one_and_update(
         {"_id": ObjectId(chat_id)},
-        {"$set": {"messages": chat.messages, "last_updated": datetime.now(timezone.utc)}}
+        {
+            "$push": {"messages": {"$each": bulk_update_messages}},
+            "$inc": {"message_count": added_count},
+            "$set": {"last_updated": datetime.now(timezone.utc)},
+        },
+        projection={"message_count": 1},
+        return_document=ReturnDocument.AFTER,
     )
-    return {"status": "success", "added_count": len(bulk_update_messages)}
+    if not chat:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    first_seq = chat["message_count"] - added_count
+    return {
+        "status": "success",
+        "added_count": added_count,
+        "first_seq": first_seq,
+        "last_seq": chat["message_count"] - 1,
+    }
 
 @app.get("/chats")
-async def get_chats(db: AsyncMongoClient = Depends(get_db)):
+async def get_chats(page: Page = Depends(page_params), db: AsyncMongoClient = Depends(get_db)):
     """
-    Get all chats from the database
+    List chats in _id order, a page at a time (see pagination.paginate)
     """
-    collection = db['chats']
-    chats = await collection.find().to_list()
-    for chat in chats:
-        chat["_id"] = str(chat["_id"])
-    return chats
+    return await paginate(db['chats'], {}, page)
 
 @app.get("/chats/space/{space_id}")
 async def get_chats_space(space_id: str, db: AsyncMongoClient = Depends(get_db)):
@@ -224,37 +297,49 @@ async def get_chats_space(space_id: str, db: AsyncMongoClient = Depends(get_db))
     """
     collection = db['chats']
     chats = await collection.find({"space_id": space_id}).to_list()
-    for chat in chats:
-        chat["_id"] = str(chat["_id"])
-    return chats
+    return MongoJSONResponse(chats)
 
 @app.get("/chats/user/{user_id}")
-async def get_chats_user(user_id: str, db: AsyncMongoClient = Depends(get_db)):
+async def get_chats_user(
+    user_id: str,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    db: AsyncMongoClient = Depends(get_db),
+):
+    """
+    List the chats in a user's spaces, most recently updated first, without their messages.
+    Every chat unless limit or cursor is passed; page with cursor set to the
+    X-Next-Cursor header of the previous page.
     """
-    Get all chats of a user
-     """
     chats_collection = db['chats']
     space_collection = db['spaces']
 
-    # Get all spaces owned by the user
-    user_spaces = await space_collection.find({"user_id": user_id}).to_list()
-    # print(user_spaces)
-    chats = await chats_collection.find().to_list()
-    # print(chats)
-
-    # Extract their ObjectIds
-    user_space_ids = [space["_id"] for space in user_spaces]
-
-    if not user_space_ids:
+    # Get the ids of all spaces owned by the user
+    user_spaces = await space_collection.find({"user_id": user_id}, projection={"_id": 1}).to_list()
+    if not user_spaces:
         return []
 
-    # Get all chats that belong to those spaces
-    final_chats = []
-    for chat in chats:
-        if ObjectId(chat["space_id"]) in user_space_ids:
-            chat["_id"] = str(chat["_id"])
-            final_chats.append(chat)
-    return final_chats
+    query = {"space_id": {"$in": [str(space["_id"]) for space in user_spaces]}}
+    if cursor:
+        limit = limit or 50
+        last_updated, last_id = parse_chat_cursor(cursor)
+        # chats without last_updated sort last; $lt against null matches nothing
+        query["$or"] = [
+            {"last_updated": {"$lt": last_updated}},
+            {"last_updated": last_updated, "_id": {"$lt": last_id}},
+        ]
+    chats = await chats_collection.find(
+        query,
+        projection=CHAT_LIST_PROJECTION,
+        sort=[("last_updated", -1), ("_id", -1)],
+        limit=limit or 0,
+    ).to_list()
+    headers = {}
+    if limit is not None and len(chats) == limit:
+        last = chats[-1]
+        last_updated = last.get("last_updated")
+        headers["X-Next-Cursor"] = f"{last_updated.isoformat() if last_updated else ''}|{last['_id']}"
+    return MongoJSONResponse(chats, headers=headers)
 
 @app.get("/chats/{chat_id}")
 async def get_chat(chat_id: str, db: AsyncMongoClient = Depends(get_db)):
@@ -265,9 +350,76 @@ async def get_chat(chat_id: str, db: AsyncMongoClient = Depends(get_db)):
     chat = await collection.find_one({"_id": ObjectId(chat_id)})
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
-    chat["_id"] = str(chat["_id"])
-
-    return chat
+    return MongoJSONResponse(chat)
+
+@app.get("/chats/{chat_id}/messages")
+async def get_chat_messages(
+    chat_id: str,
+    since_seq: Optional[int] = Query(None, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    tail: Optional[int] = Query(None, ge=1, le=500),
+    db: AsyncMongoClient = Depends(get_db),
+):
+    """
+    Get a window of a chat's messages without loading the whole history.
+    tail=N returns the last N messages; otherwise up to limit messages
+    starting at since_seq. Page forward with since_seq=next_seq and back
+    with since_seq=prev_seq, limit=start_seq - prev_seq.
+    """
+    collection = db['chats']
+    if tail is not None:
+        window = {"$slice": -tail}
+    else:
+        window = {"$slice": [since_seq or 0, limit]}
+    chat = await collection.find_one(
+        {"_id": ObjectId(chat_id)},
+        projection={"messages": window, "message_count": 1, "summary": 1, "summary_seq": 1, "summarized_tokens": 1}
+    )
+    if not chat:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    messages = chat.get("messages", [])
+    message_count = chat.get("message_count", 0)
+    if tail is not None:
+        start_seq = message_count - len(messages)
+    else:
+        start_seq = min(since_seq or 0, message_count)
+    next_seq = start_seq + len(messages)
+    # start of the previous window, clamped at the first message
+    prev_seq = max(0, start_seq - limit) if start_seq > 0 else None
+    return MongoJSONResponse({
+        "status": "success",
+        "chat_id": chat_id,
+        "message_count": message_count,
+        "start_seq": start_seq,
+        "prev_seq": prev_seq,
+        "next_seq": next_seq,
+        "has_more": next_seq < message_count,
+        "summary": chat.get("summary", ""),
+        "summary_seq": chat.get("summary_seq", 0),
+        "summarized_tokens": chat.get("summarized_tokens", 0),
+        "messages": messages,
+    })
+
+@app.put("/chats/{chat_id}/summary")
+async def update_chat_summary(chat_id: str, chat_summary: ChatSummary, db: AsyncMongoClient = Depends(get_db)):
+    """
+    Replace the running summary of a chat.
+    Only moves forward: a summary covering fewer messages than the stored one is rejected.
+    """
+    collection = db['chats']
+    updated_chat = await collection.update_one(
+        {
+            "_id": ObjectId(chat_id),
+            "message_count": {"$gte": chat_summary.summary_seq},
+            "$or": [{"summary_seq": {"$lt": chat_summary.summary_seq}}, {"summary_seq": {"$exists": False}}],
+        },
+        {"$set": chat_summary.model_dump()}
+    )
+    if updated_chat.matched_count == 0:
+        if not await collection.find_one({"_id": ObjectId(chat_id)}, projection={"_id": 1}):
+            raise HTTPException(status_code=404, detail="Chat not found")
+        raise HTTPException(status_code=409, detail="Summary is stale")
+    return {"status": "success", "chat_id": chat_id, "summary_seq": chat_summary.summary_seq}
 
 @app.delete("/chats/{chat_id}")
 async def delete_chat(chat_id: str, db: AsyncMongoClient = Depends(get_db)):
@@ -293,13 +445,17 @@ async def add_topic_to_chat(add_topic_to_chat: AddTopicToChat, db: AsyncMongoCli
             related_chats=[add_topic_to_chat.chat_id],
             level_of_understanding=LevelOfUnderstanding.Learning
         )
-        await collection.insert_one(new_topic.model_dump())
-        return {"status": "success", "topic_name": new_topic.name}
-    else:
-        updated_chat = await collection.update_one({"name": add_topic_to_chat.name}, {"$push": {"related_chats": add_topic_to_chat.chat_id}})
-        if updated_chat.modified_count == 0:
-            raise HTTPException(status_code=404, detail="Topic not found")
-        return {"status": "success", "topic_name": add_topic_to_chat.name}
+        try:
+            await collection.insert_one(new_topic.model_dump())
+            return {"status": "success", "topic_name": new_topic.name}
+        except DuplicateKeyError:
+            # created concurrently; fall through and add the chat to it
+            pass
+    # $addToSet keeps related_chats free of repeats; re-adding a chat matches without modifying
+    updated_chat = await collection.update_one({"name": add_topic_to_chat.name}, {"$addToSet": {"related_chats": add_topic_to_chat.chat_id}})
+    if updated_chat.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Topic not found")
+    return {"status": "success", "topic_name": add_topic_to_chat.name}
 
 @app.put("/update_topic_level_of_understanding")
 async def update_topic_level_of_understanding(update_topic_level_of_understanding: UpdateTopicLevelOfUnderstanding, db: AsyncMongoClient = Depends(get_db)):
@@ -313,15 +469,11 @@ async def update_topic_level_of_understanding(update_topic_level_of_understandin
     return {"status": "success", "topic_name": update_topic_level_of_understanding.name}
 
 @app.get("/topics")
-async def get_topics(db: AsyncMongoClient = Depends(get_db)):
+async def get_topics(page: Page = Depends(page_params), db: AsyncMongoClient = Depends(get_db)):
     """
-    Get all topics from the database
+    List topics in _id order, a page at a time (see pagination.paginate)
     """
-    collection = db['topics']
-    topics = await collection.find().to_list()
-    for topic in topics:
-        topic["_id"] = str(topic["_id"])
-    return topics
+    return await paginate(db['topics'], {}, page)
 
 @app.get("/topics/{topic_name}")
 async def get_topic(topic_name: str, db: AsyncMongoClient = Depends(get_db)):
@@ -332,27 +484,43 @@ async def get_topic(topic_name: str, db: AsyncMongoClient = Depends(get_db)):
     topic = await collection.find_one({"name": topic_name})
     if not topic:
         raise HTTPException(status_code=404, detail="Topic not found")
-    topic["_id"] = str(topic["_id"])
-    return topic
+    return MongoJSONResponse(topic)
 
 @app.get("/topic_chats/{topic_name}")
-async def get_chats_topic(topic_name: str, db: AsyncMongoClient = Depends(get_db)):
+async def get_chats_topic(
+    topic_name: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncMongoClient = Depends(get_db),
+):
     """
-    Get all chats of a topic
+    Get the chats of a topic, in the order they were related to it, without their messages.
+    Fetches a page of related chats with one $in query.
     """
     collection = db['topics']
     collection_chats = db['chats']
-    topic = await collection.find_one({"name": topic_name})
+    topic = await collection.find_one({"name": topic_name}, projection={"related_chats": 1})
     if not topic:
         raise HTTPException(status_code=404, detail="Topic not found")
-    topic = Topic(**topic)
+    # topics written before $addToSet may list a chat more than once
+    chat_ids = [chat_id for chat_id in dict.fromkeys(topic.get("related_chats", [])) if ObjectId.is_valid(chat_id)]
+    page = chat_ids[skip:skip + limit]
+    found = await collection_chats.find(
+        {"_id": {"$in": [ObjectId(chat_id) for chat_id in page]}},
+        projection=CHAT_LIST_PROJECTION,
+    ).to_list()
+    by_id = {str(chat["_id"]): chat for chat in found}
     chats = []
-    for chat_id in topic.related_chats:
-        chat = await collection_chats.find_one({"_id": ObjectId(chat_id)})
+    for chat_id in page:
+        chat = by_id.get(chat_id)
         if chat:
-            chat["_id"] = str(chat["_id"])
             chats.append(chat)
-    return {"status": "success", "chats": chats}
+    return MongoJSONResponse({
+        "status": "success",
+        "chats": chats,
+        "total": len(chat_ids),
+        "next_skip": skip + limit if skip + limit < len(chat_ids) else None,
+    })
 
 
 @app.post("/documents")
@@ -364,94 +532,146 @@ async def parse_file(
     db = Depends(get_db),
 ):
     """
-    Parse a file and add it to the database with a vector embedding
+    Queue a file to be parsed, chunked and embedded in the background.
+    Poll /documents/jobs/{job_id} for progress; the document id is reserved up front.
     """
-    collection = db['documents']
     if not file:
         raise HTTPException(status_code=400, detail="File is required")
-    file_content = await file.read()
+    if not ObjectId.is_valid(space_id):
+        raise HTTPException(status_code=400, detail="Invalid space_id")
     filename = file.filename.lower() if file.filename else ""
-    
-    if filename.endswith('.pdf'):
-        # Parse PDF file
-        pdf_file = io.BytesIO(file_content)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text_content = ""
-        for idx, page in enumerate(pdf_reader.pages):
-            text_content += f"Page {idx + 1}\n"
-            text_content += page.extract_text() + "\n"
-        embedding = get_embedding(text_content)
-        document = Document(
-            user_id=user_id,
-            space_id=space_id,
-            name=filename,
-            chat_id=chat_id,
-            text_content=text_content.strip(),
-            embedding=embedding
-        )
-        inserted_document = await collection.insert_one(document.model_dump())
-        return {"status": "success", "document_id": str(inserted_document.inserted_id)}
-        
-    elif filename.endswith('.docx'):
-        # Parse DOCX file
-        docx_file = io.BytesIO(file_content)
-        doc = DocxDocument(docx_file)
-        text_content = ""
-        for paragraph in doc.paragraphs:
-            text_content += paragraph.text + "\n"
-        embedding = get_embedding(text_content)
-        document = Document(
-            user_id=user_id,
-            space_id=space_id,
-            name=filename,
-            chat_id=chat_id,
-            text_content=text_content.strip(),
-            embedding=embedding
-        )
-        inserted_document = await collection.insert_one(document.model_dump())
-        return {"status": "success", "document_id": str(inserted_document.inserted_id)}
-        
-    elif filename.endswith(('.txt', '.md')):
-        # Parse plain text files
-        text_content = file_content.decode('utf-8')
-        embedding = get_embedding(text_content)
-        document = Document(
-            user_id=user_id,
-            space_id=space_id,
-            name=filename,
-            chat_id=chat_id,
-            text_content=text_content.strip(),
-            embedding=embedding
-        )
-        inserted_document = await collection.insert_one(document.model_dump())
-        return {"status": "success", "document_id": str(inserted_document.inserted_id)}
-        
-    else:
+    if not filename.endswith(SUPPORTED_EXTENSIONS):
         raise HTTPException(status_code=400, detail=f"Unsupported file type. Supported formats: PDF, DOCX, TXT, MD")
-            
+
+    if file.size is not None and file.size > max_file_bytes:
+        raise HTTPException(status_code=413, detail=f"File is larger than {max_file_bytes} bytes")
+
+    # copy the upload to the spool a block at a time, never holding the whole file
+    job_id = ObjectId()
+    path = spool_path(job_id, filename)
+    size = 0
+    fingerprint = hashlib.sha256()
+    try:
+        with open(path, "wb") as f:
+            while block := await file.read(upload_block_bytes):
+                size += len(block)
+                if size > max_file_bytes:
+                    raise HTTPException(status_code=413, detail=f"File is larger than {max_file_bytes} bytes")
+                fingerprint.update(block)
+                f.write(block)
+    except BaseException:
+        os.remove(path)
+        raise
+    sha256 = fingerprint.hexdigest()
+
+    # the same file was already uploaded to this space, or is being ingested right now
+    existing = await db['documents'].find_one({"space_id": space_id, "sha256": sha256}, projection={"_id": 1})
+    if existing:
+        os.remove(path)
+        return {"status": "success", "duplicate": True, "document_id": str(existing["_id"])}
+    pending = await db['ingest_jobs'].find_one(
+        {"space_id": space_id, "sha256": sha256, "status": {"$in": ["queued", "running"]}},
+        projection={"_id": 1, "status": 1, "document_id": 1}
+    )
+    if pending:
+        os.remove(path)
+        return {
+            "status": "success",
+            "duplicate": True,
+            "job_id": str(pending["_id"]),
+            "job_status": pending["status"],
+            "document_id": str(pending["document_id"]),
+        }
+
+    job = IngestJob(
+        user_id=user_id,
+        space_id=space_id,
+        chat_id=chat_id,
+        filename=filename,
+        path=path,
+        sha256=sha256,
+        document_id=ObjectId(),
+    )
+    await ingest_queue.enqueue(db, {"_id": job_id, **job.model_dump()})
+    return {
+        "status": "success",
+        "duplicate": False,
+        "job_id": str(job_id),
+        "job_status": job.status,
+        "document_id": str(job.document_id),
+    }
+
+@app.get("/documents/jobs/{job_id}")
+async def get_ingest_job(job_id: str, db: AsyncMongoClient = Depends(get_db)):
+    """
+    Get the progress of a document ingestion job
+    """
+    collection = db['ingest_jobs']
+    job = await collection.find_one({"_id": ObjectId(job_id)}, projection={"path": 0, "worker": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return MongoJSONResponse(job)
+
+@app.get("/documents/{document_id}/text")
+async def get_document_text(document_id: str, db: AsyncMongoClient = Depends(get_db)):
+    """
+    Stream a document's text as plain text, rebuilt from its chunks a chunk at a time
+    """
+    document = await db['documents'].find_one(
+        {"_id": ObjectId(document_id)}, projection={"chunk_count": 1, "text_content": 1}
+    )
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    async def stream():
+        if not document.get("chunk_count"):
+            # documents ingested before chunking keep their whole text on the document
+            yield document.get("text_content") or ""
+            return
+        cursor = db['document_chunks'].find(
+            {"document_id": document_id},
+            projection={"_id": 0, "text": 1, "overlap_chars": 1, "section_index": 1},
+            sort=[("chunk_index", 1)],
+        )
+        section_index = None
+        async for chunk in cursor:
+            if section_index is not None and chunk.get("section_index") != section_index:
+                yield "\n"
+            section_index = chunk.get("section_index")
+            # every chunk repeats the tail of the previous one; skip it
+            yield chunk["text"][chunk.get("overlap_chars", 0):]
+
+    return StreamingResponse(stream(), media_type="text/plain; charset=utf-8")
 
 @app.get("/documents/{document_id}")
-async def get_document(document_id: str, db: AsyncMongoClient = Depends(get_db)):
+async def get_document(
+    document_id: str,
+    fields: Optional[str] = None,
+    db: AsyncMongoClient = Depends(get_db),
+):
     """
-    Get a document from the database
+    Get a document's metadata; see document_projection for fields
     """
     collection = db['documents']
-    document = await collection.find_one({"_id": ObjectId(document_id)})
-    document["_id"] = str(document["_id"])
+    document = await collection.find_one({"_id": ObjectId(document_id)}, projection=document_projection(fields))
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
-    return document
+    return MongoJSONResponse(document)
 
 @app.get("/documents")
-async def get_documents(db: AsyncMongoClient = Depends(get_db)):
+async def get_documents(
+    space_id: Optional[str] = None,
+    fields: Optional[str] = None,
+    page: Page = Depends(page_params),
+    db: AsyncMongoClient = Depends(get_db),
+):
     """
-    Get all documents from the database
+    List documents' metadata in _id order, optionally for one space, a page at a time (see pagination.paginate)
     """
-    collection = db['documents']
-    documents = await collection.find().to_list()
-    for document in documents:
-        document["_id"] = str(document["_id"])
-    return documents
+    query = {}
+    if space_id:
+        query["space_id"] = space_id
+    return await paginate(db['documents'], query, page, projection=document_projection(fields))
 
 @app.delete("/documents/{document_id}")
 async def delete_document(document_id: str, db: AsyncMongoClient = Depends(get_db)):
@@ -459,67 +679,101 @@ async def delete_document(document_id: str, db: AsyncMongoClient = Depends(get_d
     Delete a document from the database
     """
     collection = db['documents']
-    deleted_document = await collection.delete_one({"_id": ObjectId(document_id)})
-    if deleted_document.deleted_count == 0:
+    deleted_document = await collection.find_one_and_delete({"_id": ObjectId(document_id)}, projection={"space_id": 1})
+    if deleted_document is None:
         raise HTTPException(status_code=404, detail="Document not found")
+    await db['document_chunks'].delete_many({"document_id": document_id})
+    await vector_store.remove_document(db, deleted_document["space_id"], document_id)
     return {"status": "success", "document_id": str(document_id)}
 
 @app.post("/search_documents/")
 async def search_documents(search_documents: SearchDocuments, db: AsyncMongoClient = Depends(get_db)):
     """
-    Vector Search for documents in the database
+    Search document chunks of a space on the backend selected by VECTOR_BACKEND:
+    vector similarity, full-text, or both fused with reciprocal rank fusion,
+    optionally re-ranked with a local cross-encoder.
+    The space (and user) filter is applied inside each search, so other spaces never take up the limit.
     """
-    collection = db['documents']
-    query_embedding = get_embedding(search_documents.query)
-    
     print(search_documents)
-    
-    pipeline = [
-        {
-            "$vectorSearch": {
-                    "index": "vector_index",
-                    "queryVector": query_embedding,
-                    "path": "embedding",
-                    "exact": True,
-                    "limit": search_documents.limit
-            }
-        }, 
-        {
-            "$match": {"space_id": search_documents.space_id}
-        },
-        {
-            "$project": {
-                "_id": 0, 
-                "text_content": 1,
-                "score": {
-                    "$meta": "vectorSearchScore"
-                }
-            }
-        },
-    ]
-    
-    results = await collection.aggregate(pipeline)
-    results = await results.to_list()
-    return {"status": "success", "results": results}
-    
-    
+    if not ObjectId.is_valid(search_documents.space_id):
+        raise HTTPException(status_code=400, detail="Invalid space_id")
+    started = time.perf_counter()
+    timings = {}
+    limit = search_documents.limit
+    mode = search_documents.mode
+    # fusion and re-ranking need a deeper candidate list than the final limit
+    fetch = limit
+    if mode == "hybrid":
+        fetch = max(fetch, hybrid_candidates)
+    if search_documents.rerank:
+        fetch = max(fetch, rerank_candidates)
+
+    async def vector_results():
+        stage_start = time.perf_counter()
+        query_embedding = await get_embedding(search_documents.query, input_type="query")
+        timings["embed"] = (time.perf_counter() - stage_start) * 1000
+        stage_start = time.perf_counter()
+        results = await vector_store.search(
+            db,
+            query_embedding,
+            search_documents.space_id,
+            fetch,
+            user_id=search_documents.user_id,
+            exact=search_documents.exact,
+            num_candidates=search_documents.num_candidates or fetch * num_candidates_per_result,
+        )
+        timings["vector"] = (time.perf_counter() - stage_start) * 1000
+        return results
+
+    async def text_results():
+        stage_start = time.perf_counter()
+        results = await vector_store.text_search(
+            db, search_documents.query, search_documents.space_id, fetch, user_id=search_documents.user_id
+        )
+        timings["text"] = (time.perf_counter() - stage_start) * 1000
+        return results
+
+    if mode == "vector":
+        results = await vector_results()
+    elif mode == "text":
+        results = await text_results()
+    else:
+        vector_hits, text_hits = await asyncio.gather(vector_results(), text_results())
+        stage_start = time.perf_counter()
+        results = reciprocal_rank_fusion({"vector": vector_hits, "text": text_hits})
+        timings["fuse"] = (time.perf_counter() - stage_start) * 1000
+
+    if search_documents.rerank:
+        stage_start = time.perf_counter()
+        try:
+            results = await rerank(search_documents.query, results[:rerank_candidates])
+        except RerankUnavailable as e:
+            raise HTTPException(status_code=501, detail=str(e))
+        timings["rerank"] = (time.perf_counter() - stage_start) * 1000
+
+    timings["total"] = (time.perf_counter() - started) * 1000
+    return {
+        "status": "success",
+        "mode": mode,
+        "results": results[:limit],
+        "timings_ms": {stage: round(ms, 2) for stage, ms in timings.items()},
+    }
+
+
 @app.post("/add_topic_score")
 async def add_topic_score(user_topic: str, db: AsyncMongoClient = Depends(get_db)):
     """
-    Calculate the score for a topic
+    Add one point to a topic's score, creating the score at 1 for a new topic
     """
     collection = db['topic_score']
-    topic = await collection.find_one({"name": user_topic})
-    if not topic:
-        new_topic = TopicScore(
-            topic_name=user_topic,
-            score=1
-        )
-        await collection.insert_one(new_topic.model_dump())
-        return {"status": "success", "topic_score": 1}
-    else:
-        await collection.update_one({"name": user_topic}, {"$set": {"score": topic.score + 1}})
-    return {"status": "success", "topic_score": topic.score + 1}
+    # one atomic upsert, so concurrent calls can't lose increments
+    topic = await collection.find_one_and_update(
+        {"topic_name": user_topic},
+        {"$inc": {"score": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return {"status": "success", "topic_score": topic["score"]}
 
 @app.get("/topic_scores/{user_topic}")
 async def get_topic_scores(user_topic: str, db: AsyncMongoClient = Depends(get_db)):
@@ -0,0 +1,84 @@
+"""
+Chunk and embed documents ingested before chunking, so search finds them.
+
+Search reads only document_chunks; documents uploaded before chunking keep
+their text in text_content and have no chunks. This splits each such
+document's text into chunks the same way ingestion does, embeds them and
+stores them with the document's id, then sets its chunk_count. Documents
+that already have chunks are skipped, so the script can be re-run or
+interrupted safely. With VECTOR_BACKEND=local, run it while the service is
+stopped so the service reloads the updated per-space index files.
+
+Run: python backfill_chunks.py [--dry-run]
+"""
+
+import argparse
+import asyncio
+from chunking import chunk_sections, line_sections
+from db import DB_NAME, open_client, close_client
+from embeddings import get_embeddings, max_batch_size
+from models import DocumentChunk
+from vector_store import backend as vector_store
+
+
+async def backfill_document(db, document: dict) -> int:
+    """Chunk, embed and store one legacy document; returns its chunk count."""
+    document_id = str(document["_id"])
+    chunks_collection = db['document_chunks']
+    # a previous interrupted run may have stored part of this document
+    await chunks_collection.delete_many({"document_id": document_id})
+    await vector_store.remove_document(db, document["space_id"], document_id)
+    sections = line_sections(document["text_content"].splitlines(), markdown=document["name"].endswith(".md"))
+    chunks = list(chunk_sections(sections))
+    for start in range(0, len(chunks), max_batch_size):
+        batch = chunks[start:start + max_batch_size]
+        embeddings = await get_embeddings([chunk["text"] for chunk in batch])
+        stored = [
+            DocumentChunk(
+                document_id=document_id,
+                user_id=document["user_id"],
+                space_id=document["space_id"],
+                chat_id=document.get("chat_id"),
+                name=document["name"],
+                embedding=embedding,
+                **chunk,
+            ).model_dump()
+            for chunk, embedding in zip(batch, embeddings)
+        ]
+        await chunks_collection.insert_many(stored)
+        await vector_store.add_chunks(db, stored)
+    await db['documents'].update_one({"_id": document["_id"]}, {"$set": {"chunk_count": len(chunks)}})
+    return len(chunks)
+
+
+async def main(dry_run: bool):
+    client = await open_client()
+    try:
+        db = client[DB_NAME]
+        # legacy documents have their text inline and no chunk_count
+        cursor = db['documents'].find(
+            {"text_content": {"$nin": [None, ""]}, "chunk_count": {"$in": [None, 0]}},
+            projection={"embedding": 0},
+        )
+        documents = 0
+        chunks = 0
+        async for document in cursor:
+            documents += 1
+            if dry_run:
+                print(f"would chunk {document['_id']} ({document['name']})")
+                continue
+            count = await backfill_document(db, document)
+            chunks += count
+            print(f"{document['_id']} ({document['name']}): {count} chunks")
+        if dry_run:
+            print(f"{documents} documents to backfill")
+        else:
+            print(f"backfilled {documents} documents into {chunks} chunks")
+    finally:
+        await close_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="list the documents without writing")
+    asyncio.run(main(parser.parse_args().dry_run))
@@ -0,0 +1,28 @@
+"""
+Give chats created before message_count existed a counter matching their history.
+
+Message seqs and GET /chats/{chat_id}/messages rely on message_count, which
+PUT /bulk/messages keeps up to date. Run this once after upgrading; chats
+that already have a counter are left alone, so re-running it is harmless.
+
+Run: python backfill_message_counts.py
+"""
+
+import asyncio
+from db import DB_NAME, open_client, close_client
+
+
+async def main():
+    client = await open_client()
+    try:
+        result = await client[DB_NAME]['chats'].update_many(
+            {"message_count": {"$exists": False}},
+            [{"$set": {"message_count": {"$size": {"$ifNull": ["$messages", []]}}}}]
+        )
+        print(f"backfilled message_count on {result.modified_count} chats")
+    finally:
+        await close_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""
+Parsing throughput benchmark: inline on the event loop vs the process pool.
+
+Simulates N concurrent uploads of the same file and reports, for each mode,
+files parsed per second and the longest the event loop was unable to run
+anything else (what every other request of the process would have waited).
+
+Run: python bench_parse.py path/to/lecture.pdf [N]
+"""
+
+import asyncio
+import sys
+import time
+from chunking import pdf_sections, docx_sections, line_sections
+import parsing
+
+
+def parse_inline(path: str, filename: str) -> list:
+    # what parse_file did before parsing moved to the process pool
+    if filename.endswith('.pdf'):
+        return list(pdf_sections(parsing.PyPDF2.PdfReader(path)))
+    elif filename.endswith('.docx'):
+        return docx_sections(parsing.DocxDocument(path))
+    with open(path, encoding="utf-8") as f:
+        return list(line_sections(f, markdown=filename.endswith('.md')))
+
+
+async def watch_loop(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Return the longest gap between ticks that were scheduled interval apart."""
+    worst = 0.0
+    while not stop.is_set():
+        before = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - before - interval)
+    return worst
+
+
+async def run(mode: str, path: str, uploads: int):
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(watch_loop(stop))
+    await asyncio.sleep(0)
+
+    async def one_inline():
+        return parse_inline(path, path.lower())
+
+    start = time.perf_counter()
+    if mode == "inline":
+        results = await asyncio.gather(*(one_inline() for _ in range(uploads)))
+    else:
+        results = await asyncio.gather(*(parsing.parse_sections(path, path.lower()) for _ in range(uploads)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    worst_stall = await watcher
+    sections = len(results[0]) if results else 0
+    print(
+        f"{mode:>6}: {uploads} uploads ({sections} sections each) in {elapsed:.2f}s, "
+        f"{uploads / elapsed:.2f} files/s, longest event loop stall {worst_stall * 1000:.0f}ms"
+    )
+
+
+async def main(path: str, uploads: int):
+    await run("inline", path, uploads)
+    parsing.start_executor()
+    # warm the workers up so process start-up isn't counted
+    await parsing.parse_sections(path, path.lower())
+    try:
+        await run("pool", path, uploads)
+    finally:
+        parsing.shutdown_executor()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    asyncio.run(main(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 8))
@@ -0,0 +1,72 @@
+"""
+Response serialization benchmark: the old jsonable_encoder path vs MongoJSONResponse.
+
+Builds N synthetic chat documents with M messages each, shaped like what
+GET /chats/{chat_id} reads from Mongo (ObjectId, datetimes), and reports the
+time per document to turn them into a response body both ways.
+
+Run: python bench_serialization.py [N] [MESSAGES]
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from serialization import MongoJSONResponse
+
+
+def make_chat(messages: int) -> dict:
+    start = datetime(2025, 1, 1)
+    return {
+        "_id": ObjectId(),
+        "space_id": str(ObjectId()),
+        "chat_name": "Lecture 4 review",
+        "last_updated": start + timedelta(minutes=messages),
+        "message_count": messages,
+        "summary": "Earlier the student asked about eigenvalues. " * 20,
+        "messages": [
+            {
+                "role": "user" if idx % 2 == 0 else "assistant",
+                "content": f"Message {idx}: " + "explain the spectral theorem step by step. " * 12,
+                "timestamp": start + timedelta(seconds=idx),
+                "sources": [{"document_id": str(ObjectId()), "chunk_index": idx % 40, "score": 0.8123}],
+            }
+            for idx in range(messages)
+        ],
+    }
+
+
+def encode_old(chat: dict) -> bytes:
+    # what a handler returning the dict did before: stringify _id, then
+    # FastAPI's jsonable_encoder walk and json.dumps in JSONResponse
+    chat["_id"] = str(chat["_id"])
+    return JSONResponse(jsonable_encoder(chat)).body
+
+
+def encode_new(chat: dict) -> bytes:
+    return MongoJSONResponse(chat).body
+
+
+def measure(encode, chats: list) -> float:
+    start = time.perf_counter()
+    for chat in chats:
+        encode(chat)
+    return (time.perf_counter() - start) / len(chats)
+
+
+def main(count: int, messages: int):
+    sizes = len(encode_new(make_chat(messages)))
+    old = measure(encode_old, [make_chat(messages) for _ in range(count)])
+    new = measure(encode_new, [make_chat(messages) for _ in range(count)])
+    print(f"{count} chats x {messages} messages (~{sizes / 1024:.0f} KiB each)")
+    print(f"jsonable_encoder + json: {old * 1000:.2f}ms per chat")
+    print(f"orjson response:         {new * 1000:.2f}ms per chat ({old / new:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 500,
+    )
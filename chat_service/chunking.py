@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+from dotenv import load_dotenv
+import os
+import re
+
+load_dotenv()
+
+# chunk size and overlap, counted in whitespace-separated words as a proxy for tokens
+chunk_tokens = int(os.getenv("CHUNK_TOKENS", "400"))
+chunk_overlap = int(os.getenv("CHUNK_OVERLAP", "50"))
+# text and Markdown files are cut into sections of at most about this many characters
+max_section_chars = int(os.getenv("SECTION_MAX_CHARS", "20000"))
+
+WORD = re.compile(r"\S+")
+MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+(.*)$")
+
+
+@dataclass
+class Section:
+    """A run of text that chunks never cross: a PDF page or a block under one heading."""
+    text: str
+    page: Optional[int] = None
+    heading: Optional[str] = None
+
+
+def pdf_sections(pdf_reader) -> Iterator[Section]:
+    for idx, page in enumerate(pdf_reader.pages):
+        yield Section(text=page.extract_text() or "", page=idx + 1)
+
+
+def docx_sections(doc) -> list[Section]:
+    sections = []
+    heading = None
+    lines = []
+    for paragraph in doc.paragraphs:
+        style = paragraph.style.name if paragraph.style is not None else ""
+        if style.startswith("Heading") or style == "Title":
+            if lines:
+                sections.append(Section(text="\n".join(lines), heading=heading))
+            heading = paragraph.text.strip() or heading
+            lines = [paragraph.text]
+        else:
+            lines.append(paragraph.text)
+    if lines:
+        sections.append(Section(text="\n".join(lines), heading=heading))
+    return sections
+
+
+def line_sections(lines: Iterable[str], markdown: bool = False, max_chars: int = max_section_chars) -> Iterator[Section]:
+    """
+    Group lines into sections, starting a new one at every Markdown heading
+    (when markdown is set) and whenever a section reaches max_chars, so a
+    large text file is never held as one string.
+    """
+    heading = None
+    lines_in_section = []
+    size = 0
+    for line in lines:
+        line = line.rstrip("\r\n")
+        match = MARKDOWN_HEADING.match(line) if markdown else None
+        if lines_in_section and (match or size >= max_chars):
+            yield Section(text="\n".join(lines_in_section), heading=heading)
+            lines_in_section = []
+            size = 0
+        if match:
+            heading = match.group(1).strip()
+        lines_in_section.append(line)
+        size += len(line) + 1
+    if lines_in_section:
+        yield Section(text="\n".join(lines_in_section), heading=heading)
+
+
+def chunk_section(section: Section, size: int = chunk_tokens, overlap: int = chunk_overlap) -> Iterator[dict]:
+    """
+    Split a section into windows of size words, each sharing overlap words
+    with the previous one. Chunk spans run from the start of their first word
+    to the start of the next window's first word, so dropping the first
+    overlap_chars of every chunk and concatenating gives back the section.
+    """
+    text = section.text
+    starts = [match.start() for match in WORD.finditer(text)]
+    if not starts:
+        return
+    step = max(1, size - overlap)
+    prev_end = 0
+    first = 0
+    while True:
+        last = min(first + size, len(starts))
+        start = 0 if first == 0 else starts[first]
+        end = len(text) if last == len(starts) else starts[last]
+        yield {
+            "text": text[start:end],
+            "page": section.page,
+            "heading": section.heading,
+            "overlap_chars": max(0, prev_end - start),
+        }
+        if last == len(starts):
+            return
+        prev_end = end
+        first += step
+
+
+def chunk_sections(
+    sections: Iterable[Section],
+    size: int = chunk_tokens,
+    overlap: int = chunk_overlap,
+    first_section_index: int = 0,
+    first_chunk_index: int = 0,
+) -> Iterator[dict]:
+    """
+    Chunk every section in order, numbering chunks across the whole document.
+    Pass the running indexes when a document is chunked a batch of sections at a time.
+    """
+    chunk_index = first_chunk_index
+    for section_index, section in enumerate(sections, start=first_section_index):
+        for chunk in chunk_section(section, size, overlap):
+            chunk["section_index"] = section_index
+            chunk["chunk_index"] = chunk_index
+            chunk_index += 1
+            yield chunk
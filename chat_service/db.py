@@ -1,16 +1,100 @@
 from pymongo import AsyncMongoClient
+from pymongo.monitoring import ConnectionPoolListener
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
+DB_NAME = "aivy_db"
+
+# one client per process, opened and closed by the app lifespan
+_client: AsyncMongoClient | None = None
+
+
+class PoolStats(ConnectionPoolListener):
+    """Collects connection pool counters from pymongo's CMAP events."""
+
+    def __init__(self):
+        self.open_connections = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.pool_clears = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.open_connections = max(0, self.open_connections - 1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        self.checkouts += 1
+        self.checked_out += 1
+        self.max_checked_out = max(self.max_checked_out, self.checked_out)
+        wait_ms = getattr(event, "duration", 0.0) * 1000
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def connection_checked_in(self, event):
+        self.checked_out = max(0, self.checked_out - 1)
+
+    def snapshot(self) -> dict:
+        return {
+            "open_connections": self.open_connections,
+            "checked_out": self.checked_out,
+            "max_checked_out": self.max_checked_out,
+            "checkouts": self.checkouts,
+            "checkout_failures": self.checkout_failures,
+            "avg_wait_ms": round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 3),
+            "pool_clears": self.pool_clears,
+        }
+
+
+pool_stats = PoolStats()
+
+
+def pool_options() -> dict:
+    """Pool sizing for the shared client, tunable through env vars."""
+    return {
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "5")),
+        "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000")),
+        "waitQueueTimeoutMS": int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "10000")),
+    }
+
+
 def get_connection() -> AsyncMongoClient:
     try:
         uri = os.getenv("MONGODB_URI")
         if uri is None:
             raise ValueError("MONGODB_URI environment variable not set")
-        
-        client = AsyncMongoClient(uri)
+
+        client = AsyncMongoClient(uri, event_listeners=[pool_stats], **pool_options())
         print("MongoDB connection established")
         return client
     except Exception as e:
@@ -24,3 +108,27 @@ async def close_connection(client: AsyncMongoClient):
     except Exception as e:
         print(f"Error closing MongoDB connection: {e}")
         raise
+
+
+async def open_client() -> AsyncMongoClient:
+    """Create the process-wide client and warm the pool up before serving."""
+    global _client
+    if _client is None:
+        _client = get_connection()
+        # the first command runs server discovery and the TLS handshake, so
+        # requests don't pay for it; minPoolSize fills the rest in the background
+        await _client.admin.command("ping")
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await close_connection(_client)
+        _client = None
+
+
+def get_client() -> AsyncMongoClient:
+    if _client is None:
+        raise RuntimeError("MongoDB client is not open; is the app lifespan running?")
+    return _client
@@ -0,0 +1,191 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+import asyncio
+import hashlib
+import os
+import voyageai
+from pymongo import UpdateOne
+from db import DB_NAME, get_client
+from models import encode_vector, vector_to_list
+
+load_dotenv()
+
+model = "voyage-3-large"
+vo = voyageai.AsyncClient()
+
+# in-process LRU entries, and how long the Mongo tier keeps an embedding
+cache_size = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+cache_ttl = int(os.getenv("EMBEDDING_CACHE_TTL", str(30 * 24 * 3600)))
+
+
+class EmbeddingCache:
+    """In-process LRU in front of the embedding_cache collection, with hit/miss counters."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: OrderedDict[str, list[float]] = OrderedDict()
+        self.memory_hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> list[float] | None:
+        embedding = self.entries.get(key)
+        if embedding is not None:
+            self.entries.move_to_end(key)
+            self.memory_hits += 1
+        return embedding
+
+    def put(self, key: str, embedding: list[float]):
+        self.entries[key] = embedding
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.mongo_hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "memory_hits": self.memory_hits,
+            "mongo_hits": self.mongo_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.mongo_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+cache = EmbeddingCache(cache_size)
+
+# how long the batcher waits for more requests, the most texts per Voyage call,
+# and how many Voyage calls may be in flight at once
+batch_window_ms = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+max_batch_size = int(os.getenv("EMBED_MAX_BATCH_SIZE", "128"))
+max_concurrency = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces embed requests that arrive within a short window into one
+    batched Voyage call per input_type. A semaphore bounds the number of
+    concurrent calls, so bursts queue up here instead of hitting rate limits.
+    """
+
+    def __init__(self, window_ms: float, max_batch_size: int, max_concurrency: int):
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.pending: dict[str, list[tuple[str, asyncio.Future]]] = {}
+        self.timers: dict[str, asyncio.TimerHandle] = {}
+        self.tasks: set[asyncio.Task] = set()
+        self.calls = 0
+        self.texts = 0
+
+    async def embed(self, text: str, input_type: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self.pending.setdefault(input_type, [])
+        batch.append((text, future))
+        if len(batch) >= self.max_batch_size:
+            self.flush(input_type)
+        elif len(batch) == 1:
+            self.timers[input_type] = loop.call_later(self.window, self.flush, input_type)
+        return await future
+
+    def flush(self, input_type: str):
+        timer = self.timers.pop(input_type, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self.pending.pop(input_type, None)
+        if batch:
+            task = asyncio.create_task(self.send(batch, input_type))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def send(self, batch: list[tuple[str, asyncio.Future]], input_type: str):
+        async with self.semaphore:
+            try:
+                result = await vo.embed([text for text, _ in batch], model=model, input_type=input_type)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+        self.calls += 1
+        self.texts += len(batch)
+        for (_, future), embedding in zip(batch, result.embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "texts": self.texts,
+            "avg_batch_size": round(self.texts / self.calls, 2) if self.calls else 0.0,
+            "pending": sum(len(batch) for batch in self.pending.values()),
+        }
+
+
+batcher = EmbeddingBatcher(batch_window_ms, max_batch_size, max_concurrency)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_key(text: str, input_type: str) -> str:
+    return f"{model}:{input_type}:{text_hash(text)}"
+
+
+def cache_collection():
+    return get_client()[DB_NAME]["embedding_cache"]
+
+
+async def get_embeddings(texts: list[str], input_type: str = "document") -> list[list[float]]:
+    """
+    Embed texts with Voyage, answering from the LRU or the embedding_cache
+    collection when the same (model, input_type, text) was embedded before.
+    Misses go through the batcher, so concurrent callers share Voyage calls.
+    """
+    keys = [cache_key(text, input_type) for text in texts]
+    found: dict[str, list[float]] = {}
+    for key in keys:
+        embedding = cache.get(key)
+        if embedding is not None:
+            found[key] = embedding
+
+    collection = cache_collection()
+    lookup = list({key for key in keys if key not in found})
+    if lookup:
+        async for cached in collection.find({"_id": {"$in": lookup}}, projection={"embedding": 1}):
+            cache.mongo_hits += 1
+            embedding = vector_to_list(cached["embedding"])
+            cache.put(cached["_id"], embedding)
+            found[cached["_id"]] = embedding
+
+    missing = {key: text for key, text in zip(keys, texts) if key not in found}
+    if missing:
+        cache.misses += len(missing)
+        embeddings = await asyncio.gather(*(batcher.embed(text, input_type) for text in missing.values()))
+        now = datetime.now(timezone.utc)
+        writes = []
+        for (key, text), embedding in zip(missing.items(), embeddings):
+            cache.put(key, embedding)
+            found[key] = embedding
+            writes.append(UpdateOne(
+                {"_id": key},
+                {"$setOnInsert": {
+                    "model": model,
+                    "input_type": input_type,
+                    "sha256": text_hash(text),
+                    # float32 binary vector; entries written as float lists still read back
+                    "embedding": encode_vector(embedding, "float32"),
+                    "created_at": now,
+                }},
+                upsert=True
+            ))
+        await collection.bulk_write(writes, ordered=False)
+    return [found[key] for key in keys]
+
+
+async def get_embedding(data: str, input_type: str = "document") -> list[float]:
+    return (await get_embeddings([data], input_type))[0]
@@ -0,0 +1,70 @@
+from dotenv import load_dotenv
+import asyncio
+import os
+import threading
+
+load_dotenv()
+
+# reciprocal rank fusion constant; larger values flatten the advantage of top ranks
+rrf_k = int(os.getenv("HYBRID_RRF_K", "60"))
+# how many results each retriever contributes to fusion, and how many fused results are re-ranked
+hybrid_candidates = int(os.getenv("HYBRID_CANDIDATES", "20"))
+rerank_candidates = int(os.getenv("RERANK_CANDIDATES", "20"))
+rerank_model_name = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+_rerank_model = None
+_rerank_lock = threading.Lock()
+
+
+class RerankUnavailable(Exception):
+    """Re-ranking was requested but sentence-transformers isn't installed."""
+
+
+def result_key(result: dict) -> tuple:
+    return (result.get("document_id"), result.get("chunk_index"))
+
+
+def reciprocal_rank_fusion(ranked: dict[str, list[dict]], k: int = rrf_k) -> list[dict]:
+    """
+    Merge ranked result lists by summing 1 / (k + rank) for every list a chunk
+    appears in. Each source's own score is kept as <source>_score.
+    """
+    fused: dict[tuple, dict] = {}
+    for source, results in ranked.items():
+        for rank, result in enumerate(results, start=1):
+            key = result_key(result)
+            entry = fused.get(key)
+            if entry is None:
+                entry = {field: value for field, value in result.items() if field != "score"}
+                entry["score"] = 0.0
+                fused[key] = entry
+            entry["score"] += 1 / (k + rank)
+            entry[f"{source}_score"] = result.get("score")
+    return sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)
+
+
+def load_rerank_model():
+    global _rerank_model
+    with _rerank_lock:
+        if _rerank_model is None:
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError:
+                raise RerankUnavailable("Re-ranking requires the sentence-transformers package")
+            _rerank_model = CrossEncoder(rerank_model_name)
+    return _rerank_model
+
+
+def rerank_scores(query: str, texts: list[str]) -> list[float]:
+    model = load_rerank_model()
+    return [float(score) for score in model.predict([(query, text) for text in texts])]
+
+
+async def rerank(query: str, results: list[dict]) -> list[dict]:
+    """Re-order results by a local cross-encoder's relevance score, kept as rerank_score."""
+    if not results:
+        return results
+    scores = await asyncio.to_thread(rerank_scores, query, [result.get("text") or "" for result in results])
+    for result, score in zip(results, scores):
+        result["rerank_score"] = score
+    return sorted(results, key=lambda result: result["rerank_score"], reverse=True)
@@ -0,0 +1,154 @@
+"""
+Indexes the chat service relies on, applied at startup by ensure_indexes.
+
+Also runnable on its own against MONGODB_URI:
+
+    python indexes.py            create the indexes (idempotent)
+    python indexes.py --report   also explain every query in QUERIES and flag collection scans
+"""
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from embeddings import cache_ttl
+
+# unique indexes only cover documents that have the field, so documents written
+# without it (e.g. pet_service users, which have no email) don't collide on null
+HAS_STRING = {"$type": "string"}
+
+# collection name -> indexes the service relies on; applied at startup
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True, partialFilterExpression={"email": HAS_STRING}),
+    ],
+    "spaces": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        # create_space rejects a name that is already taken
+        IndexModel([("space_name", ASCENDING)], name="space_name_unique", unique=True, partialFilterExpression={"space_name": HAS_STRING}),
+    ],
+    "chats": [
+        # chats of one space, or of a set of spaces newest first: /chats/space, /chats/user
+        IndexModel([("space_id", ASCENDING), ("last_updated", DESCENDING), ("_id", DESCENDING)], name="space_id_last_updated"),
+    ],
+    "topics": [
+        IndexModel([("name", ASCENDING)], name="name_unique", unique=True, partialFilterExpression={"name": HAS_STRING}),
+    ],
+    "topic_score": [
+        IndexModel([("topic_name", ASCENDING)], name="topic_name_unique", unique=True, partialFilterExpression={"topic_name": HAS_STRING}),
+    ],
+    "embedding_cache": [
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=cache_ttl),
+    ],
+    "ingest_jobs": [
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+        IndexModel([("space_id", ASCENDING), ("sha256", ASCENDING), ("status", ASCENDING)], name="space_id_sha256_status"),
+    ],
+    "documents": [
+        IndexModel(
+            [("space_id", ASCENDING), ("sha256", ASCENDING)],
+            name="space_id_sha256_unique",
+            unique=True,
+            partialFilterExpression={"sha256": HAS_STRING},
+        ),
+        IndexModel([("space_id", ASCENDING), ("_id", ASCENDING)], name="space_id_id"),
+    ],
+    "document_chunks": [
+        IndexModel([("document_id", ASCENDING), ("chunk_index", ASCENDING)], name="document_id_chunk_index"),
+        # the local vector backend loads a space's chunks
+        IndexModel([("space_id", ASCENDING)], name="space_id"),
+    ],
+}
+
+# (collection, filter, sort) of the filtered queries the service runs; the
+# values are placeholders, only the shape matters to the query planner
+QUERIES = [
+    ("users", {"email": "user@example.com"}, None),
+    ("spaces", {"user_id": "user"}, None),
+    ("spaces", {"space_name": "space"}, None),
+    ("chats", {"space_id": "space"}, None),
+    ("chats", {"space_id": {"$in": ["space", "other"]}}, [("last_updated", -1), ("_id", -1)]),
+    ("topics", {"name": "topic"}, None),
+    ("topic_score", {"topic_name": "topic"}, None),
+    ("ingest_jobs", {"$or": [{"status": "queued"}, {"status": "running", "lease_expires": {"$lt": 0}, "attempts": {"$lt": 3}}]}, [("created_at", 1)]),
+    ("ingest_jobs", {"status": "running", "lease_expires": {"$lt": 0}, "attempts": {"$gte": 0}}, None),
+    ("ingest_jobs", {"space_id": "space", "sha256": "hash", "status": {"$in": ["queued", "running"]}}, None),
+    ("documents", {"space_id": "space", "sha256": "hash"}, None),
+    ("documents", {"space_id": "space", "_id": {"$gt": ObjectId("0" * 24)}}, [("_id", 1)]),
+    ("document_chunks", {"document_id": "document"}, [("chunk_index", 1)]),
+    ("document_chunks", {"space_id": "space"}, None),
+]
+
+
+async def ensure_indexes(db):
+    """
+    Create every index in INDEXES. Existing identical indexes are a no-op;
+    conflicts (including unique indexes over existing duplicates) are
+    reported and skipped so startup isn't blocked.
+    """
+    for collection_name, models in INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(models)
+        except OperationFailure as e:
+            print(f"Error creating indexes on {collection_name}: {e}")
+
+
+def plan_stages(plan: dict) -> list[str]:
+    """Every stage name in an explain plan tree, root first."""
+    stages = [plan["stage"]] if "stage" in plan else []
+    for child in ("inputStage", "queryPlan"):
+        if child in plan:
+            stages += plan_stages(plan[child])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+
+async def index_report(db) -> list[dict]:
+    """Explain every query in QUERIES and record whether its winning plan scans the collection."""
+    report = []
+    for collection_name, query_filter, sort in QUERIES:
+        command = {"find": collection_name, "filter": query_filter}
+        if sort:
+            command["sort"] = dict(sort)
+        explained = await db.command("explain", command, verbosity="queryPlanner")
+        stages = plan_stages(explained["queryPlanner"]["winningPlan"])
+        report.append({
+            "collection": collection_name,
+            "filter": query_filter,
+            "sort": sort,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        })
+    return report
+
+
+def print_report(report: list[dict]) -> int:
+    """Print one line per query and return how many scan their collection."""
+    scans = 0
+    for entry in report:
+        scans += entry["collscan"]
+        flag = "COLLSCAN" if entry["collscan"] else "ok"
+        print(f"{flag:>8}  {entry['collection']} {entry['filter']} sort={entry['sort']}  [{' <- '.join(entry['stages'])}]")
+    print(f"{len(report)} queries, {scans} not covered by an index")
+    return scans
+
+
+async def main(report: bool) -> int:
+    from db import DB_NAME, open_client, close_client
+    client = await open_client()
+    try:
+        db = client[DB_NAME]
+        await ensure_indexes(db)
+        print(f"Indexes ensured on {', '.join(INDEXES)}")
+        if report:
+            return print_report(await index_report(db))
+        return 0
+    finally:
+        await close_client()
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+    # a non-zero exit when a query scans its collection lets CI catch a missing index
+    sys.exit(1 if asyncio.run(main("--report" in sys.argv[1:])) else 0)
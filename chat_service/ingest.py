@@ -0,0 +1,229 @@
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
+import asyncio
+import os
+from chunking import chunk_sections
+from parsing import iter_sections
+from embeddings import get_embeddings, max_batch_size
+from models import Document, DocumentChunk
+from vector_store import backend as vector_store
+
+load_dotenv()
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt', '.md')
+
+# where uploads wait for a worker, how many workers run per process, how often
+# idle workers re-check the queue, and how long a claimed job may go without
+# progress before another worker takes it over
+spool_dir = os.getenv("INGEST_SPOOL_DIR", "ingest_spool")
+worker_count = int(os.getenv("INGEST_WORKERS", "2"))
+poll_interval = float(os.getenv("INGEST_POLL_INTERVAL", "5"))
+lease_seconds = int(os.getenv("INGEST_LEASE_SECONDS", "300"))
+# claims per job; a job whose lease keeps running out (say it crashes the process) is then failed
+max_attempts = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+
+
+def spool_path(job_id: ObjectId, filename: str) -> str:
+    return os.path.join(spool_dir, f"{job_id}{os.path.splitext(filename)[1]}")
+
+
+class IngestQueue:
+    """
+    Document ingestion queue backed by the ingest_jobs collection.
+    Workers claim queued jobs (or jobs whose lease ran out) with an atomic
+    find_one_and_update, so several processes can share the queue without a broker.
+    """
+
+    def __init__(self):
+        self.wakeup = asyncio.Event()
+        self.workers: list[asyncio.Task] = []
+
+    def start(self, db, count: int = worker_count):
+        os.makedirs(spool_dir, exist_ok=True)
+        for idx in range(count):
+            self.workers.append(asyncio.create_task(self.work(db, f"{os.getpid()}-{idx}")))
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    async def enqueue(self, db, job: dict) -> ObjectId:
+        await db['ingest_jobs'].insert_one(job)
+        self.wakeup.set()
+        return job["_id"]
+
+    async def claim(self, db, worker: str) -> dict | None:
+        now = datetime.now(timezone.utc)
+        return await db['ingest_jobs'].find_one_and_update(
+            {"$or": [
+                {"status": "queued"},
+                {"status": "running", "lease_expires": {"$lt": now}, "attempts": {"$lt": max_attempts}},
+            ]},
+            {
+                "$set": {
+                    "status": "running",
+                    "worker": worker,
+                    "started_at": now,
+                    "updated_at": now,
+                    "lease_expires": now + timedelta(seconds=lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def give_up(self, db):
+        """Fail one job whose lease ran out on its last allowed attempt, if any."""
+        now = datetime.now(timezone.utc)
+        job = await db['ingest_jobs'].find_one_and_update(
+            {"status": "running", "lease_expires": {"$lt": now}, "attempts": {"$gte": max_attempts}},
+            {"$set": {
+                "status": "failed",
+                "error": f"Gave up after {max_attempts} attempts",
+                "updated_at": now,
+                "lease_expires": None,
+            }},
+        )
+        if job is not None:
+            print(f"Gave up on ingest job {job['_id']} after {max_attempts} attempts")
+            await discard_job(db, job)
+
+    async def work(self, db, worker: str):
+        while True:
+            try:
+                await self.give_up(db)
+                job = await self.claim(db, worker)
+            except Exception as e:
+                print(f"Error claiming ingest job: {e}")
+                job = None
+            if job is None:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await process_job(db, job)
+            except Exception as e:
+                print(f"Error ingesting job {job['_id']}: {e}")
+                # a failure here must not end the worker; an unrecorded job is retried when its lease runs out
+                try:
+                    await discard_job(db, job)
+                except Exception as cleanup_error:
+                    print(f"Error cleaning up ingest job {job['_id']}: {cleanup_error}")
+                try:
+                    await update_job(db, job["_id"], status="failed", error=str(e))
+                except Exception as update_error:
+                    print(f"Error marking ingest job {job['_id']} failed: {update_error}")
+
+
+async def update_job(db, job_id: ObjectId, **fields):
+    """Record progress on a job and extend its lease."""
+    now = datetime.now(timezone.utc)
+    fields["updated_at"] = now
+    if fields.get("status") in ("done", "failed"):
+        fields["lease_expires"] = None
+    else:
+        fields["lease_expires"] = now + timedelta(seconds=lease_seconds)
+    await db['ingest_jobs'].update_one({"_id": job_id}, {"$set": fields})
+
+
+def remove_spool(path: str):
+    try:
+        os.remove(path)
+    except OSError as e:
+        print(f"Error removing spooled upload {path}: {e}")
+
+
+async def discard_job(db, job: dict):
+    """
+    Remove what a failed job stored before failing, so no chunks without a
+    document stay searchable, and its spooled upload.
+    """
+    document_id = str(job["document_id"])
+    await db['document_chunks'].delete_many({"document_id": document_id})
+    await vector_store.remove_document(db, job["space_id"], document_id)
+    remove_spool(job["path"])
+
+
+async def process_job(db, job: dict):
+    """
+    Parse, chunk and embed an uploaded file a batch of sections at a time,
+    storing each batch's chunks before the next is parsed, then store the document.
+    """
+    job_id = job["_id"]
+    filename = job["filename"]
+    # the document id is reserved at upload time, so a retried job replaces
+    # its own partial output instead of adding a second copy
+    document_id = job["document_id"]
+    chunks_collection = db['document_chunks']
+    await chunks_collection.delete_many({"document_id": str(document_id)})
+    await vector_store.remove_document(db, job["space_id"], str(document_id))
+
+    await update_job(db, job_id, stage="parsing", sections_parsed=0, chunks_total=0, chunks_embedded=0)
+    section_count = 0
+    chunk_count = 0
+    async for sections in iter_sections(job["path"], filename):
+        chunks = list(chunk_sections(sections, first_section_index=section_count, first_chunk_index=chunk_count))
+        section_count += len(sections)
+        await update_job(db, job_id, stage="embedding", sections_parsed=section_count, chunks_total=chunk_count + len(chunks))
+        for start in range(0, len(chunks), max_batch_size):
+            batch = chunks[start:start + max_batch_size]
+            embeddings = await get_embeddings([chunk["text"] for chunk in batch])
+            documents = [
+                DocumentChunk(
+                    document_id=str(document_id),
+                    user_id=job["user_id"],
+                    space_id=job["space_id"],
+                    chat_id=job.get("chat_id"),
+                    name=filename,
+                    embedding=embedding,
+                    **chunk,
+                ).model_dump()
+                for chunk, embedding in zip(batch, embeddings)
+            ]
+            # insert_many sets each dict's _id, which the vector store keys rows by
+            await chunks_collection.insert_many(documents)
+            await vector_store.add_chunks(db, documents)
+            chunk_count += len(batch)
+            await update_job(db, job_id, chunks_embedded=chunk_count)
+
+    await update_job(db, job_id, stage="storing")
+    document = Document(
+        user_id=job["user_id"],
+        space_id=job["space_id"],
+        name=filename,
+        chat_id=job.get("chat_id"),
+        sha256=job.get("sha256"),
+        chunk_count=chunk_count,
+    )
+    for attempt in range(3):
+        try:
+            await db['documents'].replace_one({"_id": document_id}, document.model_dump(), upsert=True)
+            break
+        except DuplicateKeyError:
+            existing = await db['documents'].find_one(
+                {"space_id": job["space_id"], "sha256": job.get("sha256")}, projection={"_id": 1}
+            )
+            if existing is None:
+                # the identical document was deleted after it blocked this one; store this one after all
+                continue
+            # an identical upload to the same space finished first; point this job at it
+            await chunks_collection.delete_many({"document_id": str(document_id)})
+            await vector_store.remove_document(db, job["space_id"], str(document_id))
+            document_id = existing["_id"]
+            break
+    else:
+        raise RuntimeError("Could not store the document: an identical upload keeps conflicting with it")
+    await update_job(db, job_id, status="done", stage="done", document_id=document_id)
+    remove_spool(job["path"])
+
+
+queue = IngestQueue()
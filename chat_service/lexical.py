@@ -0,0 +1,70 @@
+from collections import Counter
+import heapq
+import math
+import re
+
+TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return [token.lower() for token in TOKEN.findall(text)]
+
+
+class Bm25Index:
+    """
+    In-memory BM25 over the chunks of one space: an inverted index of term
+    frequencies, updated as chunks are added and documents removed.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # chunk id -> (document_id, user_id, token count, distinct terms)
+        self.chunks: dict[str, tuple[str, str, int, list[str]]] = {}
+        self.postings: dict[str, dict[str, int]] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add(self, chunk_id: str, document_id: str, user_id: str, text: str):
+        if chunk_id in self.chunks:
+            return
+        counts = Counter(tokenize(text))
+        length = sum(counts.values())
+        for term, count in counts.items():
+            self.postings.setdefault(term, {})[chunk_id] = count
+        self.chunks[chunk_id] = (document_id, user_id, length, list(counts))
+        self.total_length += length
+
+    def remove_document(self, document_id: str) -> int:
+        removed = [chunk_id for chunk_id, entry in self.chunks.items() if entry[0] == document_id]
+        for chunk_id in removed:
+            _, _, length, terms = self.chunks.pop(chunk_id)
+            self.total_length -= length
+            for term in terms:
+                postings = self.postings[term]
+                del postings[chunk_id]
+                if not postings:
+                    del self.postings[term]
+        return len(removed)
+
+    def search(self, query: str, limit: int, user_id: str | None = None) -> list[tuple[str, float]]:
+        """Chunk ids and BM25 scores of the limit best matching chunks."""
+        if not self.chunks:
+            return []
+        count = len(self.chunks)
+        average_length = self.total_length / count or 1
+        scores: dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, frequency in postings.items():
+                length = self.chunks[chunk_id][2]
+                norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        if user_id:
+            scores = {chunk_id: score for chunk_id, score in scores.items() if self.chunks[chunk_id][1] == user_id}
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
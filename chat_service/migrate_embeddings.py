@@ -0,0 +1,103 @@
+"""
+Rewrite embeddings as BSON binary vectors of the storage dtype.
+
+Converts document_chunks and legacy documents embeddings to the
+EMBEDDING_STORAGE dtype (float32 or int8), and embedding_cache entries to
+float32. Embeddings stored as arrays of doubles and binary vectors of the
+other dtype are both re-encoded; documents already in the target dtype are
+skipped, so the script can be re-run or interrupted safely. To change the
+storage dtype, set EMBEDDING_STORAGE, run this, then run set_indices.py so
+the vector index matches. Going from int8 back to float32 keeps int8 precision.
+
+Run: python migrate_embeddings.py [--dtype float32|int8] [--batch-size 500] [--dry-run]
+"""
+
+import argparse
+import bson
+from dotenv import load_dotenv
+from bson.binary import Binary, BinaryVectorDtype
+from pymongo import MongoClient, UpdateOne
+import os
+from models import VECTOR_SUBTYPE, embedding_storage, encode_vector, vector_to_floats
+
+load_dotenv()
+
+# collection -> storage dtype; the cache keeps full float32 so cached query embeddings aren't degraded
+COLLECTIONS = {
+    "document_chunks": None,
+    "documents": None,
+    "embedding_cache": "float32",
+}
+
+
+DTYPE_BYTES = {"float32": BinaryVectorDtype.FLOAT32.value, "int8": BinaryVectorDtype.INT8.value}
+
+
+def needs_conversion(value, dtype: str) -> bool:
+    """Arrays always; binary vectors when their dtype byte isn't the target's."""
+    if isinstance(value, Binary):
+        return value.subtype == VECTOR_SUBTYPE and value[:1] != DTYPE_BYTES[dtype]
+    return isinstance(value, list) and len(value) > 0
+
+
+def migrate(collection, dtype: str, batch_size: int, dry_run: bool) -> tuple[int, int, int]:
+    """Convert one collection; returns (documents, bytes before, bytes after)."""
+    converted = 0
+    before = 0
+    after = 0
+    writes = []
+    # arrays of numbers, and binary vectors, whose dtype is checked below
+    cursor = collection.find(
+        {"$or": [{"embedding.0": {"$exists": True}}, {"embedding": {"$type": "binData"}}]},
+        projection={"embedding": 1},
+        batch_size=batch_size,
+    )
+    for document in cursor:
+        embedding = document["embedding"]
+        if not needs_conversion(embedding, dtype):
+            continue
+        values = vector_to_floats(embedding) if isinstance(embedding, Binary) else embedding
+        vector = encode_vector(values, dtype)
+        before += len(bson.encode({"embedding": embedding}))
+        after += len(bson.encode({"embedding": vector}))
+        converted += 1
+        # skip the write if the embedding changed since it was read
+        writes.append(UpdateOne(
+            {"_id": document["_id"], "embedding": embedding},
+            {"$set": {"embedding": vector}},
+        ))
+        if len(writes) >= batch_size:
+            if not dry_run:
+                collection.bulk_write(writes, ordered=False)
+            writes = []
+    if writes and not dry_run:
+        collection.bulk_write(writes, ordered=False)
+    return converted, before, after
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dtype", choices=["float32", "int8"], default=embedding_storage)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="report sizes without writing")
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv("MONGODB_URI"))
+    database = client["aivy_db"]
+    try:
+        for name, dtype in COLLECTIONS.items():
+            dtype = dtype or args.dtype
+            converted, before, after = migrate(database[name], dtype, args.batch_size, args.dry_run)
+            if converted:
+                print(
+                    f"{name}: {'would convert' if args.dry_run else 'converted'} {converted} embeddings to {dtype}, "
+                    f"{before / converted:.0f} -> {after / converted:.0f} bytes each ({before / after:.1f}x)"
+                )
+            else:
+                print(f"{name}: nothing to convert")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
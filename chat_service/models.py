@@ -4,7 +4,95 @@ from datetime import datetime, timezone
 from pydantic import BaseModel, Field, GetCoreSchemaHandler
 from pydantic_core import core_schema
 from bson import ObjectId
+from bson.binary import Binary, BinaryVectorDtype
 from docx import Document as DocxDocument
+from dotenv import load_dotenv
+import os
+import numpy as np
+
+load_dotenv()
+
+# how chunk embeddings are stored: "float32" or "int8" BSON binary vectors (BinData subtype 9)
+embedding_storage = os.getenv("EMBEDDING_STORAGE", "float32")
+
+VECTOR_SUBTYPE = 9
+NUMPY_DTYPES = {
+    BinaryVectorDtype.FLOAT32.value: np.dtype("<f4"),
+    BinaryVectorDtype.INT8.value: np.dtype("i1"),
+}
+
+
+def encode_vector(values, dtype: str = embedding_storage) -> Binary:
+    """
+    Pack an embedding into a BSON binary vector, the same bytes Binary.from_vector
+    writes. int8 storage scales each vector so its largest component maps to
+    127, using the whole int8 range; see vector_to_floats for decoding.
+    """
+    if isinstance(values, Binary) and values.subtype == VECTOR_SUBTYPE:
+        return values
+    array = np.asarray(values, dtype=np.float32)
+    if dtype == "int8":
+        peak = float(np.abs(array).max()) if array.size else 0.0
+        packed = np.clip(np.rint(array * (127 / (peak or 1))), -127, 127).astype("i1")
+        header = BinaryVectorDtype.INT8.value
+    elif dtype == "float32":
+        packed = array.astype("<f4")
+        header = BinaryVectorDtype.FLOAT32.value
+    else:
+        raise ValueError(f"Unknown embedding storage {dtype!r}; expected 'float32' or 'int8'")
+    # dtype byte, padding byte (always 0 for whole-byte types), then the packed components
+    return Binary(header + b"\x00" + packed.tobytes(), VECTOR_SUBTYPE)
+
+
+def decode_vector(value) -> np.ndarray:
+    """
+    NumPy view of a stored embedding. Binary vectors are read in place, without
+    copying; int8 vectors keep their int8 values. Legacy float lists are converted.
+    """
+    if isinstance(value, Binary) and value.subtype == VECTOR_SUBTYPE:
+        return np.frombuffer(value, dtype=NUMPY_DTYPES[value[:1]], offset=2)
+    return np.asarray(value, dtype=np.float32)
+
+
+def vector_to_floats(value) -> np.ndarray:
+    """
+    A stored embedding as float32. int8 vectors are rescaled to unit length:
+    embeddings are normalized before they are stored, so the per-vector scale
+    encode_vector applied is the int8 vector's norm and needs no separate field.
+    """
+    vector = decode_vector(value)
+    if vector.dtype == np.int8:
+        vector = vector.astype(np.float32)
+        vector /= np.linalg.norm(vector) or 1
+    return vector
+
+
+def vector_to_list(value) -> list[float]:
+    """A stored embedding as plain floats, for JSON responses."""
+    if isinstance(value, Binary) and value.subtype == VECTOR_SUBTYPE:
+        return vector_to_floats(value).tolist()
+    return list(value)
+
+
+class BinaryVector:
+    """
+    Pydantic type for stored embeddings: validates a list of floats (or an
+    already packed vector) into a BSON binary vector, kept as Binary by
+    model_dump() and dumped as a float list in JSON mode.
+    """
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            encode_vector,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda value, info: vector_to_list(value) if info.mode_is_json() else value,
+                info_arg=True,
+            ),
+        )
+
+
+Embedding = Annotated[Binary, BinaryVector]
 
 
 class User(BaseModel):
@@ -23,9 +111,21 @@ class Chat(BaseModel):
     space_id: str
     title: str
     messages: List[Any] = Field(default_factory=list)
+    # number of messages ever appended; message i has seq i
+    message_count: int = 0
+    # running summary of messages [0, summary_seq), maintained by the tutor agent
+    summary: str = ""
+    summary_seq: int = 0
+    summarized_tokens: int = 0
     last_updated: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+class ChatSummary(BaseModel):
+    summary: str
+    summary_seq: int
+    summarized_tokens: int = 0
+
+
 class LevelOfUnderstanding(str, Enum):
     Learning = "Learning"
     Basic = "Basic"
@@ -42,8 +142,50 @@ class Topic(BaseModel):
 class Document(BaseModel):
     user_id: str
     name: str
-    text_content: str
-    embedding: List[float] = Field(default_factory=list)
+    # full text of documents ingested before chunking; newer documents keep their text only in their chunks
+    text_content: Optional[str] = None
+    # whole-document embedding of documents ingested before chunking; new documents are searched by chunk
+    embedding: Optional[Embedding] = None
     space_id: str
     chat_id: Optional[str] = None
+    # fingerprint of the uploaded file; unique per space
+    sha256: Optional[str] = None
+    chunk_count: int = 0
     last_updated: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class DocumentChunk(BaseModel):
+    document_id: str
+    user_id: str
+    space_id: str
+    chat_id: Optional[str] = None
+    name: str
+    chunk_index: int
+    section_index: int
+    page: Optional[int] = None
+    heading: Optional[str] = None
+    text: str
+    # leading characters repeated from the previous chunk of the same section
+    overlap_chars: int = 0
+    embedding: Embedding
+
+
+class IngestJob(BaseModel):
+    user_id: str
+    space_id: str
+    chat_id: Optional[str] = None
+    filename: str
+    path: str
+    sha256: Optional[str] = None
+    # id the document will be stored under once the job is done
+    document_id: Any
+    status: str = "queued"
+    stage: str = "queued"
+    attempts: int = 0
+    sections_parsed: int = 0
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    error: Optional[str] = None
+    lease_expires: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from typing import Literal, Optional
+from bson import ObjectId
+from dotenv import load_dotenv
+from fastapi import HTTPException, Query
+from fastapi.responses import StreamingResponse
+import os
+from serialization import MongoJSONResponse, dumps
+
+load_dotenv()
+
+# page size when a client pages with after_id but no limit, and the most it may ask for
+default_limit = int(os.getenv("PAGE_DEFAULT_LIMIT", "100"))
+max_limit = int(os.getenv("PAGE_MAX_LIMIT", "1000"))
+
+
+@dataclass
+class Page:
+    """
+    Keyset page of a list endpoint: documents with _id greater than after_id, in
+    _id order. limit is None when the client didn't ask to page, for every document.
+    """
+    after_id: Optional[ObjectId]
+    limit: Optional[int]
+    ndjson: bool
+
+
+def page_params(
+    after_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=max_limit),
+    format: Literal["json", "ndjson"] = "json",
+) -> Page:
+    """
+    FastAPI dependency reading after_id, limit and format from the query string.
+    Paging is opt-in so existing clients that fetch a whole list keep getting all of it.
+    """
+    if after_id is not None and not ObjectId.is_valid(after_id):
+        raise HTTPException(status_code=400, detail="Invalid after_id")
+    if limit is None and after_id is not None:
+        limit = default_limit
+    return Page(after_id=ObjectId(after_id) if after_id else None, limit=limit, ndjson=format == "ndjson")
+
+
+async def ndjson_lines(cursor):
+    """One JSON line per document, encoded as the cursor yields them."""
+    async for document in cursor:
+        yield dumps(document) + b"\n"
+
+
+async def paginate(
+    collection,
+    query: dict,
+    page: Page,
+    projection: Optional[dict] = None,
+):
+    """
+    Find one keyset page of query. JSON mode returns the documents as a list and,
+    when the page is full, sets X-Next-After-Id to the after_id of the next page.
+    NDJSON mode streams the documents instead; the last line's _id is the next after_id.
+    """
+    if page.after_id is not None:
+        query = {**query, "_id": {"$gt": page.after_id}}
+    cursor = collection.find(query, projection=projection, sort=[("_id", 1)], limit=page.limit or 0)
+    if page.ndjson:
+        return StreamingResponse(ndjson_lines(cursor), media_type="application/x-ndjson")
+    documents = await cursor.to_list()
+    headers = {}
+    if page.limit is not None and len(documents) == page.limit:
+        headers["X-Next-After-Id"] = str(documents[-1]["_id"])
+    return MongoJSONResponse(documents, headers=headers)
@@ -0,0 +1,161 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import AsyncIterator
+from dotenv import load_dotenv
+from docx import Document as DocxDocument
+import asyncio
+import os
+import PyPDF2
+from chunking import Section, docx_sections, line_sections
+
+load_dotenv()
+
+# parsing runs in worker processes so CPU-bound text extraction never blocks the event loop
+parse_workers = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 2)))
+# large PDFs are split into page ranges of this size, parsed in parallel
+pages_per_task = int(os.getenv("PARSE_PAGES_PER_TASK", "20"))
+parse_timeout = float(os.getenv("PARSE_TIMEOUT_SECONDS", "120"))
+max_file_bytes = int(os.getenv("PARSE_MAX_FILE_BYTES", str(50 * 1024 * 1024)))
+max_pages = int(os.getenv("PARSE_MAX_PAGES", "2000"))
+
+_executor: ProcessPoolExecutor | None = None
+
+
+class ParseError(Exception):
+    """The file can't be parsed within the configured limits."""
+
+
+def start_executor(workers: int = parse_workers):
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=workers)
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def restart_executor():
+    """
+    Kill the pool's workers and start a fresh pool: after a worker died, which
+    leaves the pool unusable, or when a parse ran past its deadline and would
+    otherwise keep its worker busy.
+    """
+    global _executor
+    executor, _executor = _executor, None
+    if executor is not None:
+        # ProcessPoolExecutor has no public way to stop a running task
+        for process in list(executor._processes.values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+    start_executor()
+
+
+# The functions below run inside the worker processes.
+
+# PdfReader given a path reads the whole file into memory; given an open
+# file it seeks to the objects it needs, so each worker holds only its pages
+
+def pdf_page_count(path: str) -> int:
+    with open(path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def parse_pdf_pages(path: str, start: int, stop: int) -> list[Section]:
+    with open(path, "rb") as f:
+        pdf_reader = PyPDF2.PdfReader(f)
+        return [
+            Section(text=pdf_reader.pages[idx].extract_text() or "", page=idx + 1)
+            for idx in range(start, stop)
+        ]
+
+
+def parse_docx(path: str) -> list[Section]:
+    return docx_sections(DocxDocument(path))
+
+
+# The functions below run in the service process.
+
+def take(iterator, count: int) -> list:
+    return list(islice(iterator, count))
+
+
+async def _run(func, *args):
+    """
+    Run func in the pool. If the pool breaks under it, a pool that is still
+    current lost a worker to this task, so it is replaced and the file fails;
+    a pool that was already replaced (another file crashed or timed out) is
+    retried once on the new one.
+    """
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        executor = _executor
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            if executor is _executor:
+                restart_executor()
+                raise ParseError("A parser process died while parsing this file")
+    raise ParseError("The parser pool was restarted while parsing this file")
+
+
+async def iter_sections(path: str, filename: str) -> AsyncIterator[list[Section]]:
+    """
+    Yield the sections of a spooled upload in document order, a batch at a time,
+    so callers can chunk and store a page range before the next one is parsed.
+    PDF page ranges are parsed in the process pool, at most parse_workers
+    ranges ahead of the consumer. Raises ParseError when the file is over the
+    size or page limits or parsing runs past parse_timeout.
+    """
+    size = os.path.getsize(path)
+    if size > max_file_bytes:
+        raise ParseError(f"File is {size} bytes; the limit is {max_file_bytes}")
+    if _executor is None:
+        start_executor()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + parse_timeout
+
+    async def within_deadline(awaitable, in_pool: bool = True):
+        try:
+            return await asyncio.wait_for(awaitable, timeout=max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            if in_pool:
+                # cancelling the wait doesn't stop the worker; replace the pool to free it
+                restart_executor()
+            raise ParseError(f"Parsing took longer than {parse_timeout:g}s")
+
+    if filename.endswith('.pdf'):
+        page_count = await within_deadline(_run(pdf_page_count, path))
+        if page_count > max_pages:
+            raise ParseError(f"PDF has {page_count} pages; the limit is {max_pages}")
+        in_flight = deque()
+        try:
+            for start in range(0, page_count, pages_per_task):
+                stop = min(start + pages_per_task, page_count)
+                in_flight.append(asyncio.ensure_future(_run(parse_pdf_pages, path, start, stop)))
+                if len(in_flight) >= parse_workers:
+                    yield await within_deadline(in_flight.popleft())
+            while in_flight:
+                yield await within_deadline(in_flight.popleft())
+        finally:
+            for future in in_flight:
+                future.cancel()
+    elif filename.endswith('.docx'):
+        # python-docx loads the whole document either way
+        yield await within_deadline(_run(parse_docx, path))
+    else:
+        # text is cheap to split, so it streams from disk on a thread instead of a worker process
+        with open(path, encoding="utf-8") as f:
+            sections = line_sections(f, markdown=filename.endswith('.md'))
+            while batch := await within_deadline(asyncio.to_thread(take, sections, 32), in_pool=False):
+                yield batch
+
+
+async def parse_sections(path: str, filename: str) -> list[Section]:
+    """All sections of a spooled upload; see iter_sections."""
+    return [section async for batch in iter_sections(path, filename) for section in batch]
@@ -9,41 +9,78 @@ load_dotenv()
 uri = os.getenv("MONGODB_URI")
 client = MongoClient(uri)
 
+# must match the chat service's EMBEDDING_STORAGE
+embedding_storage = os.getenv("EMBEDDING_STORAGE", "float32")
+
 # Access your database and collection
 database = client["aivy_db"]
-collection = database["documents"]
-
-# Create your index model, then create the search index
-search_index_model = SearchIndexModel(
-  definition={
-    "fields": [
-      {
-        "type": "vector",
-        "path": "embedding",
-        "numDimensions": 1024,
-        "similarity": "dotProduct",
-        "quantization": "scalar"
-      }
-    ]
-  },
-  name="vector_index",
-  type="vectorSearch"
-)
-
-result = collection.create_search_index(model=search_index_model)
-print("New search index named " + result + " is building.")
-
-# Wait for initial sync to complete
-print("Polling to check if the index is ready. This may take up to a minute.")
-predicate=None
-if predicate is None:
-  predicate = lambda index: index.get("queryable") is True
-
-while True:
-  indices = list(collection.list_search_indexes(result))
-  if len(indices) and predicate(indices[0]):
-    break
-  time.sleep(5)
-print(result + " is ready for querying.")
+collection = database["document_chunks"]
+
+# Vector index: space_id and user_id are filter fields so $vectorSearch can pre-filter on them
+vector_definition = {
+  "fields": [
+    {
+      "type": "vector",
+      "path": "embedding",
+      "numDimensions": 1024,
+      # int8 vectors are each scaled by their own peak, so only their direction is comparable
+      "similarity": "dotProduct" if embedding_storage == "float32" else "cosine",
+      # float32 vectors are scalar-quantized in the index; int8 vectors are already quantized
+      **({"quantization": "scalar"} if embedding_storage == "float32" else {})
+    },
+    {
+      "type": "filter",
+      "path": "space_id"
+    },
+    {
+      "type": "filter",
+      "path": "user_id"
+    }
+  ]
+}
+
+# Full-text index for hybrid search: chunk text is analyzed, space_id and user_id
+# are tokens so $search can filter on them with equals
+text_definition = {
+  "mappings": {
+    "dynamic": False,
+    "fields": {
+      "text": {"type": "string", "analyzer": "lucene.standard"},
+      "space_id": {"type": "token"},
+      "user_id": {"type": "token"}
+    }
+  }
+}
+
+
+def ensure_search_index(name, index_type, definition):
+  """Create the search index, or update its definition in place if it exists already."""
+  if list(collection.list_search_indexes(name)):
+    collection.update_search_index(name, definition)
+    print("Search index named " + name + " is being updated.")
+    return name
+  result = collection.create_search_index(
+    model=SearchIndexModel(definition=definition, name=name, type=index_type)
+  )
+  print("New search index named " + result + " is building.")
+  return result
+
+
+def wait_until_queryable(name):
+  print("Polling to check if " + name + " is ready. This may take up to a minute.")
+  while True:
+    indices = list(collection.list_search_indexes(name))
+    if len(indices) and indices[0].get("queryable") is True:
+      break
+    time.sleep(5)
+  print(name + " is ready for querying.")
+
+
+names = [
+  ensure_search_index("vector_index", "vectorSearch", vector_definition),
+  ensure_search_index("text_index", "search", text_definition),
+]
+for name in names:
+  wait_until_queryable(name)
 
 client.close()
@@ -0,0 +1,395 @@
+from abc import ABC, abstractmethod
+from dotenv import load_dotenv
+from bson import ObjectId
+import asyncio
+import json
+import os
+import numpy as np
+from lexical import Bm25Index
+from models import decode_vector
+
+load_dotenv()
+
+# which vector search backend serves /search_documents/: "atlas" ($vectorSearch on
+# the Atlas vector_index) or "local" (in-process NumPy index, no Atlas Search needed)
+backend_name = os.getenv("VECTOR_BACKEND", "atlas")
+# where the local backend keeps one memory-mapped matrix per space
+local_dir = os.getenv("LOCAL_VECTOR_DIR", "vector_index")
+
+# chunk fields returned with every search result
+RESULT_PROJECTION = {
+    "_id": 0,
+    "document_id": 1,
+    "name": 1,
+    "chunk_index": 1,
+    "page": 1,
+    "heading": 1,
+    "text": 1,
+}
+
+
+class VectorBackend(ABC):
+    """
+    Vector search over document_chunks. Ingestion and deletes report chunk
+    changes through add_chunks / remove_document so backends that keep their
+    own index stay in sync; search returns projected chunks with a score.
+    """
+
+    @abstractmethod
+    async def search(
+        self,
+        db,
+        query_embedding: list[float],
+        space_id: str,
+        limit: int,
+        user_id: str | None = None,
+        exact: bool = False,
+        num_candidates: int | None = None,
+    ) -> list[dict]:
+        ...
+
+    @abstractmethod
+    async def text_search(
+        self,
+        db,
+        query: str,
+        space_id: str,
+        limit: int,
+        user_id: str | None = None,
+    ) -> list[dict]:
+        """Full-text (lexical) search over the same chunks, for hybrid retrieval."""
+
+    async def add_chunks(self, db, chunks: list[dict]):
+        pass
+
+    async def remove_document(self, db, space_id: str, document_id: str):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": backend_name}
+
+
+class AtlasVectorBackend(VectorBackend):
+    """$vectorSearch on the vector_index built by set_indices.py; Atlas keeps it in sync itself."""
+
+    async def search(self, db, query_embedding, space_id, limit, user_id=None, exact=False, num_candidates=None):
+        vector_filter = {"space_id": {"$eq": space_id}}
+        if user_id:
+            vector_filter["user_id"] = {"$eq": user_id}
+        vector_search = {
+            "index": "vector_index",
+            "queryVector": query_embedding,
+            "path": "embedding",
+            "filter": vector_filter,
+            "limit": limit,
+        }
+        if exact:
+            vector_search["exact"] = True
+        else:
+            vector_search["numCandidates"] = min(max(num_candidates or limit, limit), 10000)
+        pipeline = [
+            {"$vectorSearch": vector_search},
+            {"$project": {**RESULT_PROJECTION, "score": {"$meta": "vectorSearchScore"}}},
+        ]
+        results = await db['document_chunks'].aggregate(pipeline)
+        return await results.to_list()
+
+    async def text_search(self, db, query, space_id, limit, user_id=None):
+        # text_index (set_indices.py) maps text as a string field and space_id / user_id as tokens
+        search_filter = [{"equals": {"path": "space_id", "value": space_id}}]
+        if user_id:
+            search_filter.append({"equals": {"path": "user_id", "value": user_id}})
+        pipeline = [
+            {"$search": {
+                "index": "text_index",
+                "compound": {
+                    "must": [{"text": {"query": query, "path": "text"}}],
+                    "filter": search_filter,
+                },
+            }},
+            {"$limit": limit},
+            {"$project": {**RESULT_PROJECTION, "score": {"$meta": "searchScore"}}},
+        ]
+        results = await db['document_chunks'].aggregate(pipeline)
+        return await results.to_list()
+
+
+class SpaceIndex:
+    """
+    The chunk vectors of one space: a float32 matrix of normalized rows, appended
+    to a file and memory-mapped, plus row metadata and a deleted-row mask.
+    Rows of deleted documents are tombstoned and dropped when the file is compacted.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.dim = 0
+        self.chunk_ids: list[str] = []
+        self.document_ids: list[str] = []
+        self.user_ids: list[str] = []
+        self.deleted = np.zeros(0, dtype=bool)
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+
+    @property
+    def vectors_path(self) -> str:
+        return self.path + ".f32"
+
+    @property
+    def meta_path(self) -> str:
+        return self.path + ".json"
+
+    @property
+    def live_count(self) -> int:
+        return len(self.chunk_ids) - int(self.deleted.sum())
+
+    def load(self) -> bool:
+        """Map the stored matrix; False when this space has no files yet."""
+        if not os.path.exists(self.meta_path):
+            return False
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        self.chunk_ids = meta["chunk_ids"]
+        self.document_ids = meta["document_ids"]
+        self.user_ids = meta["user_ids"]
+        self.deleted = np.zeros(len(self.chunk_ids), dtype=bool)
+        self.deleted[meta["deleted"]] = True
+        self.remap()
+        return True
+
+    def remap(self):
+        rows = len(self.chunk_ids)
+        if rows and self.dim:
+            self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        else:
+            self.matrix = np.zeros((0, self.dim), dtype=np.float32)
+
+    def save_meta(self):
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "dim": self.dim,
+                "chunk_ids": self.chunk_ids,
+                "document_ids": self.document_ids,
+                "user_ids": self.user_ids,
+                "deleted": np.flatnonzero(self.deleted).tolist(),
+            }, f)
+        os.replace(tmp, self.meta_path)
+
+    def append(self, chunks: list[dict]):
+        # a chunk inserted while the space was being built from Mongo may be reported again
+        known = set(self.chunk_ids)
+        chunks = [chunk for chunk in chunks if str(chunk["_id"]) not in known]
+        if not chunks:
+            return
+        # binary vectors are viewed in place; stacking is the only copy
+        vectors = np.stack([decode_vector(chunk["embedding"]) for chunk in chunks]).astype(np.float32)
+        if not self.dim:
+            self.dim = vectors.shape[1]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+        self.chunk_ids.extend(str(chunk["_id"]) for chunk in chunks)
+        self.document_ids.extend(str(chunk["document_id"]) for chunk in chunks)
+        self.user_ids.extend(str(chunk["user_id"]) for chunk in chunks)
+        self.deleted = np.concatenate([self.deleted, np.zeros(len(chunks), dtype=bool)])
+        self.save_meta()
+        self.remap()
+
+    def remove_document(self, document_id: str) -> int:
+        rows = [idx for idx, doc_id in enumerate(self.document_ids) if doc_id == document_id]
+        self.deleted[rows] = True
+        if self.deleted.sum() * 2 > len(self.chunk_ids):
+            self.compact()
+        else:
+            self.save_meta()
+        return len(rows)
+
+    def compact(self):
+        """Rewrite the matrix without tombstoned rows."""
+        keep = np.flatnonzero(~self.deleted)
+        vectors = np.array(self.matrix[keep]) if len(keep) else np.zeros((0, self.dim), dtype=np.float32)
+        self.matrix = np.zeros((0, self.dim), dtype=np.float32)
+        tmp = self.vectors_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(vectors.tobytes())
+        os.replace(tmp, self.vectors_path)
+        self.chunk_ids = [self.chunk_ids[idx] for idx in keep]
+        self.document_ids = [self.document_ids[idx] for idx in keep]
+        self.user_ids = [self.user_ids[idx] for idx in keep]
+        self.deleted = np.zeros(len(keep), dtype=bool)
+        self.save_meta()
+        self.remap()
+
+    def top_k(self, query: np.ndarray, limit: int, user_id: str | None = None) -> list[tuple[str, float]]:
+        """Chunk ids and dot-product scores of the limit best live rows."""
+        if not len(self.chunk_ids):
+            return []
+        scores = self.matrix @ query
+        excluded = self.deleted
+        if user_id:
+            excluded = excluded | (np.asarray(self.user_ids) != user_id)
+        scores[excluded] = -np.inf
+        k = min(limit, int((~excluded).sum()))
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(self.chunk_ids[idx], float(scores[idx])) for idx in best]
+
+
+class LocalVectorBackend(VectorBackend):
+    """
+    In-process exact search for development, offline use and small spaces.
+    A space's index is built from document_chunks the first time it is searched
+    and then updated incrementally as documents are ingested and deleted.
+    Each process keeps its own index, so run a single worker process with it.
+    """
+
+    def __init__(self, directory: str = local_dir):
+        self.directory = directory
+        self.spaces: dict[str, SpaceIndex] = {}
+        # BM25 indexes live in memory only and are built on a space's first text search
+        self.lexical: dict[str, Bm25Index] = {}
+        self.locks: dict[str, asyncio.Lock] = {}
+
+    def space_path(self, space_id: str) -> str:
+        """
+        Path prefix of a space's index files. Space ids come from requests, so
+        anything but an ObjectId is rejected before it can name a file.
+        """
+        if not ObjectId.is_valid(space_id):
+            raise ValueError(f"Invalid space_id {space_id!r}")
+        directory = os.path.realpath(self.directory)
+        path = os.path.realpath(os.path.join(directory, space_id))
+        if os.path.dirname(path) != directory:
+            raise ValueError(f"Invalid space_id {space_id!r}")
+        return path
+
+    def lock(self, space_id: str) -> asyncio.Lock:
+        # every entry point takes the lock first, so invalid ids never get an entry
+        self.space_path(space_id)
+        return self.locks.setdefault(space_id, asyncio.Lock())
+
+    async def space(self, db, space_id: str) -> SpaceIndex:
+        index = self.spaces.get(space_id)
+        if index is not None:
+            return index
+        os.makedirs(self.directory, exist_ok=True)
+        index = SpaceIndex(self.space_path(space_id))
+        if not await asyncio.to_thread(index.load):
+            await self.build(db, index, space_id)
+        self.spaces[space_id] = index
+        return index
+
+    async def build(self, db, index: SpaceIndex, space_id: str):
+        """Load a space's existing chunk vectors from Mongo into a fresh index."""
+        for path in (index.vectors_path, index.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+        cursor = db['document_chunks'].find(
+            {"space_id": space_id},
+            projection={"_id": 1, "document_id": 1, "user_id": 1, "embedding": 1},
+        )
+        batch = []
+        async for chunk in cursor:
+            batch.append(chunk)
+            if len(batch) >= 1000:
+                await asyncio.to_thread(index.append, batch)
+                batch = []
+        if batch:
+            await asyncio.to_thread(index.append, batch)
+        if not index.chunk_ids:
+            index.save_meta()
+
+    async def search(self, db, query_embedding, space_id, limit, user_id=None, exact=False, num_candidates=None):
+        # the local index is always exact, so exact and num_candidates don't apply
+        async with self.lock(space_id):
+            index = await self.space(db, space_id)
+            query = np.asarray(query_embedding, dtype=np.float32)
+            query /= np.linalg.norm(query) or 1
+            hits = await asyncio.to_thread(index.top_k, query, limit, user_id)
+        # same scale as Atlas' dotProduct vectorSearchScore
+        return await self.fetch_chunks(db, [(chunk_id, (1 + score) / 2) for chunk_id, score in hits])
+
+    async def lexical_index(self, db, space_id: str) -> Bm25Index:
+        index = self.lexical.get(space_id)
+        if index is None:
+            index = Bm25Index()
+            cursor = db['document_chunks'].find(
+                {"space_id": space_id},
+                projection={"_id": 1, "document_id": 1, "user_id": 1, "text": 1},
+            )
+            async for chunk in cursor:
+                index.add(str(chunk["_id"]), str(chunk["document_id"]), str(chunk["user_id"]), chunk.get("text") or "")
+            self.lexical[space_id] = index
+        return index
+
+    async def text_search(self, db, query, space_id, limit, user_id=None):
+        async with self.lock(space_id):
+            index = await self.lexical_index(db, space_id)
+            hits = index.search(query, limit, user_id)
+        return await self.fetch_chunks(db, hits)
+
+    async def fetch_chunks(self, db, hits: list[tuple[str, float]]) -> list[dict]:
+        """Load the result fields of the hit chunks, in hit order, with their scores."""
+        if not hits:
+            return []
+        chunks = await db['document_chunks'].find(
+            {"_id": {"$in": [ObjectId(chunk_id) for chunk_id, _ in hits]}},
+            projection={**RESULT_PROJECTION, "_id": 1},
+        ).to_list()
+        by_id = {str(chunk.pop("_id")): chunk for chunk in chunks}
+        results = []
+        for chunk_id, score in hits:
+            chunk = by_id.get(chunk_id)
+            if chunk is not None:
+                chunk["score"] = score
+                results.append(chunk)
+        return results
+
+    async def add_chunks(self, db, chunks):
+        by_space: dict[str, list[dict]] = {}
+        for chunk in chunks:
+            by_space.setdefault(chunk["space_id"], []).append(chunk)
+        for space_id, space_chunks in by_space.items():
+            async with self.lock(space_id):
+                if space_id in self.spaces or os.path.exists(self.space_path(space_id) + ".json"):
+                    index = await self.space(db, space_id)
+                    await asyncio.to_thread(index.append, space_chunks)
+                # spaces that were never searched are built from Mongo on first search
+                lexical = self.lexical.get(space_id)
+                if lexical is not None:
+                    for chunk in space_chunks:
+                        lexical.add(str(chunk["_id"]), str(chunk["document_id"]), str(chunk["user_id"]), chunk["text"])
+
+    async def remove_document(self, db, space_id, document_id):
+        async with self.lock(space_id):
+            if space_id in self.spaces or os.path.exists(self.space_path(space_id) + ".json"):
+                index = await self.space(db, space_id)
+                await asyncio.to_thread(index.remove_document, str(document_id))
+            if space_id in self.lexical:
+                self.lexical[space_id].remove_document(str(document_id))
+
+    def stats(self) -> dict:
+        return {
+            "backend": "local",
+            "directory": self.directory,
+            "spaces": {
+                space_id: {"rows": len(index.chunk_ids), "live": index.live_count, "dim": index.dim}
+                for space_id, index in self.spaces.items()
+            },
+            "lexical_spaces": {space_id: len(index) for space_id, index in self.lexical.items()},
+        }
+
+
+def make_backend(name: str = backend_name) -> VectorBackend:
+    if name == "local":
+        return LocalVectorBackend()
+    if name == "atlas":
+        return AtlasVectorBackend()
+    raise ValueError(f"Unknown VECTOR_BACKEND {name!r}; expected 'atlas' or 'local'")
+
+
+backend = make_backend()
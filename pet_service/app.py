@@ -1,8 +1,23 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from routers import flashcards, items, users, inventory, pets
 from fastapi.middleware.cors import CORSMiddleware
+from db import open_connection, get_connection, close_connection
+from indexes import ensure_indexes
+from serialization import MongoJSONResponse
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await open_connection()
+    await ensure_indexes(get_connection())
+    try:
+        yield
+    finally:
+        await close_connection()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=MongoJSONResponse)
 
 # Allow CORS for your frontend
 origins = [
@@ -17,6 +32,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After-Id"],
 )
 
 @app.get("/")
@@ -1,35 +1,86 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from dotenv import load_dotenv
+import asyncio
 import os
 
 load_dotenv()
 
-# keep a reference to the client so we can close it later
+DB_NAME = "aivy_db"
+
+# one client per process, opened and closed by the app lifespan
 _client: AsyncIOMotorClient | None = None
 
-def get_connection() -> AsyncIOMotorDatabase:
-    """Return a Motor AsyncIOMotorDatabase instance.
+# requests currently holding a database handle; shutdown waits for them
+_in_flight = 0
+_idle = asyncio.Event()
+_idle.set()
+
+
+def pool_options() -> dict:
+    """Pool sizing for the shared client, tunable through env vars."""
+    return {
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "0")),
+        "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000")),
+        "waitQueueTimeoutMS": int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "10000")),
+    }
 
-    Uses MONGODB_URI and optional MONGODB_DB (defaults to 'pet_service').
+
+async def open_connection() -> AsyncIOMotorClient:
+    """Create the app-lifetime Motor client.
+
+    Uses MONGODB_URI and the MONGODB_* pool settings from pool_options().
     """
     global _client
+    if _client is not None:
+        return _client
     try:
         uri = os.getenv("MONGODB_URI")
         if uri is None:
             raise ValueError("MONGODB_URI environment variable not set")
 
-        _client = AsyncIOMotorClient(uri)
+        _client = AsyncIOMotorClient(uri, **pool_options())
+        await _client.admin.command("ping")
         print("MongoDB connection established")
-        return _client["aivy_db"]
+        return _client
     except Exception as e:
         print(f"Error getting MongoDB connection: {e}")
         raise
 
-async def close_connection(db: AsyncIOMotorDatabase):
+
+def get_connection() -> AsyncIOMotorDatabase:
+    """Return a database handle on the shared client."""
+    if _client is None:
+        raise RuntimeError("MongoDB client is not open; is the app lifespan running?")
+    return _client[DB_NAME]
+
+
+def acquire():
+    global _in_flight
+    _in_flight += 1
+    _idle.clear()
+
+
+def release():
+    global _in_flight
+    _in_flight -= 1
+    if _in_flight <= 0:
+        _in_flight = 0
+        _idle.set()
+
+
+async def close_connection():
+    """Wait for in-flight requests to finish, then close the shared client."""
+    global _client
+    timeout = float(os.getenv("MONGODB_DRAIN_TIMEOUT", "10"))
+    try:
+        await asyncio.wait_for(_idle.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        print(f"Closing MongoDB connection with {_in_flight} request(s) still in flight")
     try:
-        global _client
         if _client is not None:
             _client.close()
+            _client = None
             print("MongoDB connection closed")
     except Exception as e:
-        print(f"Error closing MongoDB connection: {e}")
\ No newline at end of file
+        print(f"Error closing MongoDB connection: {e}")
@@ -1,10 +1,11 @@
 from typing import AsyncGenerator
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from db import get_connection, close_connection
+from db import get_connection, acquire, release
 
 async def get_db() -> AsyncGenerator[AsyncIOMotorDatabase, None]:
     db = get_connection()
+    acquire()
     try:
         yield db
     finally:
-        await close_connection(db)
+        release()
@@ -0,0 +1,120 @@
+"""
+Indexes the pet service relies on, applied at startup by ensure_indexes.
+
+Also runnable on its own against MONGODB_URI:
+
+    python indexes.py            create the indexes (idempotent)
+    python indexes.py --report   also explain every query in QUERIES and flag collection scans
+"""
+
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+# collection name -> indexes the service relies on; applied at startup.
+# users is shared with chat_service, which owns its indexes.
+INDEXES = {
+    "flashcards": [
+        IndexModel([("topicId", ASCENDING)], name="topicId"),
+        IndexModel([("spaceId", ASCENDING)], name="spaceId"),
+    ],
+    "inventory": [
+        # one entry per (user, item); purchases add to its quantity
+        IndexModel([("userId", ASCENDING), ("itemId", ASCENDING)], name="userId_itemId_unique", unique=True),
+    ],
+    "items": [
+        IndexModel([("itemType", ASCENDING)], name="itemType"),
+    ],
+    "pets": [
+        IndexModel([("userId", ASCENDING)], name="userId"),
+        # the daily happiness decay looks up pets not petted for a day
+        IndexModel([("last_pet_time", ASCENDING)], name="last_pet_time"),
+    ],
+}
+
+# (collection, filter, sort) of the filtered queries the service runs; the
+# values are placeholders, only the shape matters to the query planner
+QUERIES = [
+    ("flashcards", {"topicId": "topic"}, None),
+    ("flashcards", {"spaceId": "space"}, None),
+    ("inventory", {"userId": ObjectId("0" * 24)}, None),
+    ("inventory", {"userId": ObjectId("0" * 24), "itemId": ObjectId("0" * 24)}, None),
+    ("items", {"itemType": "food"}, None),
+    ("pets", {"userId": ObjectId("0" * 24)}, None),
+    ("pets", {"last_pet_time": {"$lte": 0}}, None),
+]
+
+
+async def ensure_indexes(db):
+    """
+    Create every index in INDEXES. Existing identical indexes are a no-op;
+    conflicts (including unique indexes over existing duplicates) are
+    reported and skipped so startup isn't blocked.
+    """
+    for collection_name, models in INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(models)
+        except OperationFailure as e:
+            print(f"Error creating indexes on {collection_name}: {e}")
+
+
+def plan_stages(plan: dict) -> list[str]:
+    """Every stage name in an explain plan tree, root first."""
+    stages = [plan["stage"]] if "stage" in plan else []
+    for child in ("inputStage", "queryPlan"):
+        if child in plan:
+            stages += plan_stages(plan[child])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+
+async def index_report(db) -> list[dict]:
+    """Explain every query in QUERIES and record whether its winning plan scans the collection."""
+    report = []
+    for collection_name, query_filter, sort in QUERIES:
+        command = {"find": collection_name, "filter": query_filter}
+        if sort:
+            command["sort"] = dict(sort)
+        explained = await db.command("explain", command, verbosity="queryPlanner")
+        stages = plan_stages(explained["queryPlanner"]["winningPlan"])
+        report.append({
+            "collection": collection_name,
+            "filter": query_filter,
+            "sort": sort,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        })
+    return report
+
+
+def print_report(report: list[dict]) -> int:
+    """Print one line per query and return how many scan their collection."""
+    scans = 0
+    for entry in report:
+        scans += entry["collscan"]
+        flag = "COLLSCAN" if entry["collscan"] else "ok"
+        print(f"{flag:>8}  {entry['collection']} {entry['filter']} sort={entry['sort']}  [{' <- '.join(entry['stages'])}]")
+    print(f"{len(report)} queries, {scans} not covered by an index")
+    return scans
+
+
+async def main(report: bool) -> int:
+    from db import open_connection, get_connection, close_connection
+    await open_connection()
+    try:
+        db = get_connection()
+        await ensure_indexes(db)
+        print(f"Indexes ensured on {', '.join(INDEXES)}")
+        if report:
+            return print_report(await index_report(db))
+        return 0
+    finally:
+        await close_connection()
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+    # a non-zero exit when a query scans its collection lets CI catch a missing index
+    sys.exit(1 if asyncio.run(main("--report" in sys.argv[1:])) else 0)
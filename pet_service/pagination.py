@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+from typing import Optional
+from bson import ObjectId
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+import os
+from serialization import dumps
+
+load_dotenv()
+
+# page size when a client pages with after_id but no limit, and the most it may ask for
+default_limit = int(os.getenv("PAGE_DEFAULT_LIMIT", "100"))
+max_limit = int(os.getenv("PAGE_MAX_LIMIT", "1000"))
+
+
+@dataclass
+class Page:
+    """
+    Keyset page of a list endpoint: documents with _id greater than after_id, in
+    _id order. limit is None when the client didn't ask to page, for every document.
+    """
+    after_id: Optional[ObjectId]
+    limit: Optional[int]
+    ndjson: bool
+
+
+def page_params(request: Request) -> Page:
+    """
+    Read after_id, limit and format (json or ndjson) from the query string.
+    Paging is opt-in so clients that fetch a whole list keep getting all of it.
+    """
+    params = request.query_params
+    after_id = params.get("after_id")
+    if after_id is not None and not ObjectId.is_valid(after_id):
+        raise HTTPException(status_code=400, detail="Invalid after_id")
+    limit = params.get("limit")
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid limit")
+        if not 1 <= limit <= max_limit:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {max_limit}")
+    elif after_id is not None:
+        limit = default_limit
+    output = params.get("format", "json")
+    if output not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be json or ndjson")
+    return Page(after_id=ObjectId(after_id) if after_id else None, limit=limit, ndjson=output == "ndjson")
+
+
+def find_page(collection, query: dict, page: Page):
+    """Cursor over one keyset page of query."""
+    if page.after_id is not None:
+        query = {**query, "_id": {"$gt": page.after_id}}
+    return collection.find(query, sort=[("_id", 1)], limit=page.limit or 0)
+
+
+def page_headers(documents: list, page: Page) -> dict:
+    """X-Next-After-Id with the after_id of the next page, when this page is full."""
+    if page.limit is None or len(documents) < page.limit:
+        return {}
+    return {"X-Next-After-Id": str(documents[-1]["_id"])}
+
+
+async def ndjson_lines(cursor):
+    async for document in cursor:
+        yield dumps(document) + b"\n"
+
+
+def ndjson_response(cursor) -> StreamingResponse:
+    """
+    Stream a cursor as one JSON document per line, encoded as the cursor yields
+    them; the last line's _id is the after_id of the next page.
+    """
+    return StreamingResponse(ndjson_lines(cursor), media_type="application/x-ndjson")
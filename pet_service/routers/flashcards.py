@@ -4,6 +4,8 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List
 from pydantic import ValidationError, TypeAdapter
 from deps import get_db
+from pagination import page_params, find_page, page_headers, ndjson_response
+from serialization import MongoJSONResponse
 from models import Flashcard
 
 router = APIRouter()
@@ -22,17 +24,15 @@ async def get_flashcards(request: Request, db: AsyncIOMotorDatabase = Depends(ge
         elif project:
             query["spaceId"] = project
 
-        cursor = db.flashcards.find(query)
-        flashcards = []
-        async for fc in cursor:
-            if fc.get("_id") is not None:
-                try:
-                    fc["_id"] = str(fc["_id"])
-                except Exception:
-                    pass
-            flashcards.append(fc)
-
-        return {"flashcards": flashcards}
+        page = page_params(request)
+        cursor = find_page(db.flashcards, query, page)
+        if page.ndjson:
+            return ndjson_response(cursor)
+        flashcards = await cursor.to_list(length=None)
+
+        return MongoJSONResponse({"flashcards": flashcards}, headers=page_headers(flashcards, page))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -3,6 +3,7 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from pydantic import BaseModel, ValidationError
 from deps import get_db
 from bson import ObjectId
+from serialization import MongoJSONResponse
 
 router = APIRouter()
 
@@ -39,18 +40,13 @@ async def get_inventory(request: Request, db: AsyncIOMotorDatabase = Depends(get
                 print("Error fetching item:", e)
                 item = None
 
-            if item:
-                for k, v in list(item.items()):
-                    if isinstance(v, ObjectId):
-                        item[k] = str(v)
-
             inventory.append({
                 "inventoryId": inv_id,
                 "item": item,
                 "quantity": int(entry.get("quantity", 0)),
             })
 
-        return {"userId": user_id_str, "inventory": inventory}
+        return MongoJSONResponse({"userId": user_id_str, "inventory": inventory})
 
     except HTTPException:
         raise
@@ -95,13 +91,12 @@ async def purchase_item(request: Request, db: AsyncIOMotorDatabase = Depends(get
         new_coins = user_coins - total_cost
         await db.users.update_one({"_id": userId}, {"$set": {"coins": new_coins}})
 
-        inventory_entry = await db.inventory.find_one({"userId": userId, "itemId": itemId})
-        if inventory_entry:
-            inventory_id = inventory_entry["_id"]
-            new_quantity = inventory_entry.get("quantity", 0) + quantity
-            await db.inventory.update_one({"_id": inventory_id}, {"$set": {"quantity": new_quantity}})
-        else:
-            await db.inventory.insert_one({"userId": userId, "itemId": itemId, "quantity": quantity})
+        # one atomic upsert on the unique (userId, itemId) entry
+        await db.inventory.update_one(
+            {"userId": userId, "itemId": itemId},
+            {"$inc": {"quantity": quantity}},
+            upsert=True,
+        )
 
         return {"message": "Purchase successful", "remaining_coins": new_coins}
     except HTTPException:
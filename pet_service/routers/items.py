@@ -3,6 +3,8 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List
 from pydantic import ValidationError, TypeAdapter
 from deps import get_db
+from pagination import page_params, find_page, page_headers, ndjson_response
+from serialization import MongoJSONResponse
 from models import Items, food, clothing, toys
 
 router = APIRouter()
@@ -11,32 +13,28 @@ router = APIRouter()
 async def get_items(request: Request, db: AsyncIOMotorDatabase = Depends(get_db)):
     try:
         item_type = request.query_params.get("itemType")
+        page = page_params(request)
+        cursor = find_page(db.items, {"itemType": item_type} if item_type else {}, page)
+        if page.ndjson:
+            return ndjson_response(cursor)
+        items = await cursor.to_list(length=None)
         if item_type:
-            cursor = db.items.find({"itemType": item_type})
-            items = []
-            async for item in cursor:
-                if item.get("_id") is not None:
-                    try:
-                        item["_id"] = str(item["_id"])
-                    except Exception:
-                        pass
-                items.append(item)
-            return {"items": items}
+            return MongoJSONResponse({"items": items}, headers=page_headers(items, page))
 
-        # group by category: food, clothes, toys
+        # group the page by category: food, clothes, toys
         categories = {food: [], clothing: [], toys: []}
-        cursor = db.items.find()
-        async for item in cursor:
-            if item.get("_id") is not None:
-                try:
-                    item["_id"] = str(item["_id"])
-                except Exception:
-                    pass
+        for item in items:
             t = item.get("itemType", toys)
             key = toys if t not in (food, clothing, toys) else t
             categories[key].append(item)
 
-        return {food: categories[food], clothing: categories[clothing], toys: categories[toys]}
+        return MongoJSONResponse({
+            food: categories[food],
+            clothing: categories[clothing],
+            toys: categories[toys],
+        }, headers=page_headers(items, page))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
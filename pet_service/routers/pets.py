@@ -3,6 +3,8 @@ from datetime import datetime, timedelta
 from fastapi import APIRouter, Request, HTTPException, Depends
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from deps import get_db
+from pagination import page_params, find_page, page_headers, ndjson_response
+from serialization import MongoJSONResponse
 from bson import ObjectId
 
 router = APIRouter()
@@ -19,17 +21,15 @@ async def get_pets(request: Request, db: AsyncIOMotorDatabase = Depends(get_db))
             except Exception:
                 raise HTTPException(status_code=400, detail="Invalid userId format")
 
-        pet_data = await db.pets.find(query).to_list(length=None)
+        page = page_params(request)
+        cursor = find_page(db.pets, query, page)
+        if page.ndjson:
+            return ndjson_response(cursor)
+        pets = await cursor.to_list(length=None)
 
-        pets = []
-        for pet in pet_data:
-            # Convert all ObjectIds to strings
-            for key, value in pet.items():
-                if isinstance(value, ObjectId):
-                    pet[key] = str(value)
-            pets.append(pet)
-
-        return {"pets": pets}
+        return MongoJSONResponse({"pets": pets}, headers=page_headers(pets, page))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
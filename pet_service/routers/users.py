@@ -4,6 +4,7 @@ from pydantic import BaseModel, ValidationError
 from deps import get_db
 from bson import ObjectId
 from models import streak, coins
+from serialization import MongoJSONResponse
 
 router = APIRouter()
 
@@ -19,12 +20,7 @@ async def get_user(request: Request, db: AsyncIOMotorDatabase = Depends(get_db))
         if user is None:
             raise HTTPException(status_code=404, detail="User not found")
 
-        try:
-            user["_id"] = str(user["_id"])
-        except Exception:
-            pass
-
-        return {"user": user}
+        return MongoJSONResponse({"user": user})
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,33 @@
+from typing import Any
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+import orjson
+
+# chat_service/serialization.py is the same encoder plus binary vectors; keep the two in sync
+# naive datetimes from Mongo are UTC
+OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+
+
+def mongo_default(value: Any) -> Any:
+    """orjson hook for the BSON types orjson doesn't know."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=mongo_default, option=OPTIONS)
+
+
+class MongoJSONResponse(JSONResponse):
+    """
+    JSON response that serializes raw Mongo documents (ObjectId, datetime) in
+    one orjson pass. Return it from a handler to skip FastAPI's
+    jsonable_encoder walk as well.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)